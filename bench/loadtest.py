@@ -0,0 +1,163 @@
+"""Нагрузочный прогон бота на локальных заглушках.
+
+Гоняет настоящие ``Dispatcher`` и ``router`` из ``bot/handlers.py`` синтетическими
+апдейтами с заданной частотой. Telegram Bot API и сайты кинотеатров подменяются
+локальным aiohttp-сервером (см. ``bench/stubs.py``), поэтому наружу запросы не уходят.
+
+Запуск из корня репозитория:
+
+    python -m bench.loadtest --updates 2000 --rate 200 --users 300
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.enums import ParseMode
+
+from bench.stubs import StubServer, callback_update, message_update, patch_parsers
+
+STUB_TOKEN = "123456:LOADTEST-stub-token"
+
+
+def _scenarios() -> List[Tuple[str, Callable[[int], Dict[str, Any]]]]:
+    today = date.today()
+    return [
+        ("/today", lambda chat: message_update(chat, "/today")),
+        ("Все на сегодня", lambda chat: message_update(chat, "Все на сегодня")),
+        ("По дате", lambda chat: message_update(chat, "По дате")),
+        (
+            "pick:date",
+            lambda chat: callback_update(chat, f"pick:date:{(today + timedelta(days=random.randrange(7))).isoformat()}"),
+        ),
+        (
+            "pick:cinemadate",
+            lambda chat: callback_update(
+                chat,
+                f"pick:cinemadate:{random.choice(['prada', 'karo', 'kinoformat'])}:{today.isoformat()}",
+            ),
+        ),
+    ]
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _summary(values: List[float]) -> str:
+    ms = [v * 1000 for v in values]
+    return (
+        f"n={len(ms):<6} p50={percentile(ms, 0.5):8.1f} p90={percentile(ms, 0.9):8.1f} "
+        f"p99={percentile(ms, 0.99):8.1f} max={max(ms, default=0):8.1f} "
+        f"mean={statistics.fmean(ms) if ms else 0:8.1f} ms"
+    )
+
+
+async def _lag_monitor(samples: List[float], interval: float, stop: asyncio.Event) -> None:
+    """Измеряет, насколько позже запланированного просыпается цикл событий."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - started - interval))
+
+
+async def run(args: argparse.Namespace) -> None:
+    server = StubServer(site_latency=args.site_latency / 1000, api_latency=args.api_latency / 1000).start()
+    patch_parsers(server)
+
+    # Каждый прогон начинается с пустого кэша, не трогая общий sqlite-файл
+    from bot.coordination import MemoryBackend, set_backend
+    set_backend(MemoryBackend())
+
+    # Импортируем после подмены URL, чтобы роутер подхватил заглушки
+    from bot.handlers import router
+
+    session = AiohttpSession(api=TelegramAPIServer.from_base(server.base_url))
+    bot = Bot(token=STUB_TOKEN, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    dp = Dispatcher()
+    dp.include_router(router)
+
+    scenarios = _scenarios()
+    weights = [float(w) for w in args.mix.split(",")] if args.mix else [1.0] * len(scenarios)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    lag: List[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_lag_monitor(lag, args.lag_interval / 1000, stop))
+
+    async def one(name: str, update: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        try:
+            await dp.feed_raw_update(bot, update)
+        except Exception:
+            errors[name] += 1
+        latencies[name].append(time.perf_counter() - started)
+
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    tasks = []
+    for i in range(args.updates):
+        # Открытая модель нагрузки: апдейты приходят по расписанию, не дожидаясь ответов
+        delay = t0 + i / args.rate - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        name, build = random.choices(scenarios, weights=weights)[0]
+        chat = random.randrange(1, args.users + 1)
+        tasks.append(asyncio.create_task(one(name, build(chat))))
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - t0
+
+    stop.set()
+    await monitor
+    await bot.session.close()
+    server.stop()
+
+    everything = [v for values in latencies.values() for v in values]
+    print(f"updates={args.updates} rate={args.rate}/s users={args.users} elapsed={elapsed:.2f}s "
+          f"throughput={args.updates / elapsed:.1f}/s")
+    print("\nHandler latency")
+    for name, values in sorted(latencies.items()):
+        print(f"  {name:<16} {_summary(values)} errors={errors[name]}")
+    print(f"  {'all':<16} {_summary(everything)} errors={sum(errors.values())}")
+    print("\nEvent-loop lag")
+    print(f"  {'lag':<16} {_summary(lag)}")
+    print("\nStub calls")
+    for key, count in sorted(server.calls.items()):
+        print(f"  {key:<28} {count}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=1000, help="сколько апдейтов отправить")
+    parser.add_argument("--rate", type=float, default=100.0, help="апдейтов в секунду")
+    parser.add_argument("--users", type=int, default=200, help="число разных чатов")
+    parser.add_argument("--mix", default="", help="веса сценариев через запятую (today,menu,by-date,pick-date,pick-cinema)")
+    parser.add_argument("--site-latency", type=float, default=50.0, help="задержка страниц кинотеатров, мс")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="задержка Bot API, мс")
+    parser.add_argument("--lag-interval", type=float, default=10.0, help="период замера лага цикла, мс")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Бенчмарк разбора HTML: на месте против пула процессов (PARSE_WORKERS).
+
+Разбирает большую синтетическую страницу в стиле Яндекс Афиши несколько раз
+параллельно и одновременно меряет лаг цикла событий: на месте разбор держит GIL
+и цикл стоит, в пуле цикл остаётся свободным.
+
+Запуск из корня репозитория:
+
+    python -m bench.parse_pool --cards 3000 --pages 16 --workers 2,4
+
+С ``--archive <каталог>`` вместо синтетической страницы разбираются настоящие
+страницы Karo из архива (см. bot/storage/archive.py).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+from bench.loadtest import _lag_monitor, _summary
+from bench.stubs import STUB_TITLES
+from bot.config import settings
+from bot.parsers import pool
+from bot.parsers.afisha_karo import _parse_titles_from_html
+from bot.storage.archive import PageArchive
+
+
+def big_page(cards: int) -> str:
+    body = "".join(
+        f'<div class="card"><a href="/moscow/cinema/movie/{i}"><span>{STUB_TITLES[i % len(STUB_TITLES)]} {i}</span></a>'
+        f'<h3>{STUB_TITLES[i % len(STUB_TITLES)]} {i}</h3><p>{"сеанс " * 20}</p></div>'
+        for i in range(cards)
+    )
+    return f"<html><body>{body}</body></html>"
+
+
+def archived_pages(root: str) -> List[str]:
+    archive = PageArchive(root, settings.ARCHIVE_MAX_MB * 1024 * 1024)
+    return [archive.load(page.digest) for page in archive.pages("karo", unique=True)]
+
+
+async def run_mode(workers: int, pages: List[str]) -> None:
+    settings.PARSE_WORKERS = workers
+    pool.shutdown_parse_pool()
+    if workers:
+        # Прогрев не входит в замер: процессы поднимаются один раз за время жизни бота
+        pool.start_parse_pool()
+        await asyncio.gather(*(pool.parse_html(_parse_titles_from_html, "<p></p>") for _ in range(workers)))
+
+    lag: List[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_lag_monitor(lag, 0.01, stop))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(pool.parse_html(_parse_titles_from_html, html) for html in pages))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await monitor
+    pool.shutdown_parse_pool()
+
+    label = f"pool x{workers}" if workers else "inline"
+    print(f"{label:<8} wall={elapsed * 1000:8.1f} ms  titles/page={len(results[0])}  loop lag: {_summary(lag)}")
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    if args.archive:
+        pages = archived_pages(args.archive)
+        if not pages:
+            raise SystemExit(f"В архиве {args.archive} нет страниц karo")
+    else:
+        pages = [big_page(args.cards)] * args.pages
+    size = sum(len(p) for p in pages) / len(pages)
+    print(f"page size: {size / 1024:.0f} KiB avg, pages: {len(pages)}")
+    await run_mode(0, pages)
+    for workers in (int(w) for w in args.workers.split(",") if w):
+        await run_mode(workers, pages)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=3000, help="карточек фильмов на странице")
+    parser.add_argument("--pages", type=int, default=8, help="сколько страниц разобрать параллельно")
+    parser.add_argument("--workers", default="2,4", help="размеры пула через запятую")
+    parser.add_argument("--archive", default="", help="каталог архива страниц вместо синтетической страницы")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Бенчмарк холодного старта: время от запуска интерпретатора до ``start_polling``.
+
+Каждый прогон — отдельный процесс ``python``, который импортирует ``main`` и выполняет
+``main.main()`` с подменённым ``Dispatcher.start_polling``: подмена печатает момент вызова
+и сразу возвращается. Сеть не нужна; БД событий создаётся во временном каталоге.
+
+Запуск из корня репозитория:
+
+    python -m bench.startup --runs 10
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Модули, которых не должно быть в памяти к моменту start_polling
+HEAVY_MODULES = ("bs4", "lxml", "requests", "playwright", "bot.parsers.prada", "bot.parsers.afisha_karo")
+
+CHILD = r"""
+import asyncio, json, sys, time
+from aiogram import Dispatcher
+
+async def _start_polling(self, *args, **kwargs):
+    print(json.dumps({
+        "reached": time.time(),
+        "heavy": [m for m in HEAVY if m in sys.modules],
+    }))
+
+Dispatcher.start_polling = _start_polling
+import main
+asyncio.run(main.main())
+"""
+
+
+def run_once(tmpdir: str) -> dict:
+    env = {
+        **os.environ,
+        "BOT_TOKEN": "123456:STARTUP-bench-token",
+        "OWNER_CHAT_ID": "0",
+        "EVENTS_DB_PATH": os.path.join(tmpdir, "events.db"),
+        "LOOP_WATCHDOG": "0",
+    }
+    code = f"HEAVY = {HEAVY_MODULES!r}\n" + CHILD
+    started = time.time()
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    line = [l for l in out.stdout.splitlines() if l.startswith("{")][-1]
+    result = json.loads(line)
+    result["seconds"] = result["reached"] - started
+    return result
+
+
+def floor_once() -> float:
+    """Время голого ``import aiogram`` — нижняя граница, которую бот не может улучшить"""
+    started = time.time()
+    subprocess.run([sys.executable, "-c", "import aiogram.types, aiogram.methods"], check=True)
+    return time.time() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # Первый прогон прогревает .pyc и файловый кэш ОС, в статистику не идёт
+        run_once(tmpdir)
+        results = [run_once(tmpdir) for _ in range(args.runs)]
+        floor = [floor_once() * 1000 for _ in range(args.runs)]
+
+    ms = [r["seconds"] * 1000 for r in results]
+    print(f"start_polling reached: runs={len(ms)} min={min(ms):.1f} median={statistics.median(ms):.1f} "
+          f"max={max(ms):.1f} ms")
+    print(f"aiogram import floor:  runs={len(floor)} min={min(floor):.1f} median={statistics.median(floor):.1f} "
+          f"max={max(floor):.1f} ms")
+    heavy = sorted({m for r in results for m in r["heavy"]})
+    print("heavy modules loaded at startup:", ", ".join(heavy) if heavy else "none")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Локальные заглушки Telegram Bot API и сайтов кинотеатров для нагрузочных тестов."""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from aiohttp import web
+
+STUB_TITLES = [
+    "Интерстеллар",
+    "Дюна: Часть вторая",
+    "Оппенгеймер",
+    "Мастер и Маргарита",
+    "Чебурашка",
+    "Холоп 2",
+    "Бременские музыканты",
+    "Последний богатырь",
+]
+
+
+def prada_html(day: date, days: int = 7) -> str:
+    links = "".join(
+        f'<a href="?date={(day + timedelta(days=i)).isoformat()}&city=balashiha">{i}</a>'
+        for i in range(days)
+    )
+    cards = "".join(f"<h2>{t}</h2>" for t in STUB_TITLES)
+    return f"<html><body><nav>{links}</nav><h1>Расписание фильмов</h1>{cards}</body></html>"
+
+
+def karo_html() -> str:
+    cards = "".join(
+        f'<div><a href="/moscow/cinema/movie/{i}">{t}</a><h3>{t}</h3></div>'
+        for i, t in enumerate(STUB_TITLES)
+    )
+    return f"<html><body><h2>Рекомендации для вас</h2>{cards}</body></html>"
+
+
+@dataclass
+class StubServer:
+    """Один aiohttp-сервер: Bot API по /bot<token>/<method> и страницы кинотеатров.
+
+    Работает в отдельном потоке со своим циклом событий: парсер Prada ходит в сеть
+    синхронно и блокирует цикл бота, и заглушка в том же цикле никогда бы не ответила.
+    """
+
+    host: str = "127.0.0.1"
+    port: int = 0
+    site_latency: float = 0.05
+    api_latency: float = 0.0
+    calls: Counter = field(default_factory=Counter)
+    _runner: web.AppRunner | None = None
+    _loop: asyncio.AbstractEventLoop | None = None
+    _thread: threading.Thread | None = None
+    _message_ids: Any = field(default_factory=lambda: itertools.count(1))
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "StubServer":
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def serve() -> None:
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self._setup())
+            ready.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self._runner.cleanup())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=serve, name="stub-server", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self) -> None:
+        if self._loop and self._thread:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+    async def _setup(self) -> None:
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self._api)
+        app.router.add_get("/prada/", self._prada)
+        app.router.add_get("/karo", self._karo)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Порт 0 означает «любой свободный» — узнаём реальный
+        self.port = self._runner.addresses[0][1]
+
+    async def _prada(self, request: web.Request) -> web.Response:
+        self.calls["site:prada"] += 1
+        await asyncio.sleep(self.site_latency)
+        day = date.fromisoformat(request.query.get("date", date.today().isoformat()))
+        return web.Response(text=prada_html(day), content_type="text/html")
+
+    async def _karo(self, request: web.Request) -> web.Response:
+        self.calls["site:karo"] += 1
+        await asyncio.sleep(self.site_latency)
+        return web.Response(text=karo_html(), content_type="text/html")
+
+    async def _api(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[f"api:{method}"] += 1
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+        form = await request.post()
+        return web.json_response({"ok": True, "result": self._result(method.lower(), form)})
+
+    def _result(self, method: str, form: Any) -> Any:
+        if method == "getme":
+            return {"id": 1, "is_bot": True, "first_name": "stub", "username": "stub_bot"}
+        if method.startswith("send") or method.startswith("edit"):
+            chat_id = int(form.get("chat_id") or 0)
+            return {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": form.get("text", ""),
+            }
+        return True
+
+
+def patch_parsers(server: StubServer) -> None:
+    """Перенаправляет парсеры на заглушку вместо реальных сайтов."""
+    from bot.parsers import afisha_karo, prada
+
+    prada.BASE_URL = f"{server.base_url}/prada/"
+    afisha_karo.BASE_YA = f"{server.base_url}/karo"
+
+
+_update_ids = itertools.count(1)
+_user = {"id": 0, "is_bot": False, "first_name": "load"}
+
+
+def message_update(chat_id: int, text: str) -> Dict[str, Any]:
+    entities: List[Dict[str, Any]] = []
+    if text.startswith("/"):
+        entities.append({"type": "bot_command", "offset": 0, "length": len(text.split()[0])})
+    return {
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": next(_update_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {**_user, "id": chat_id},
+            "text": text,
+            "entities": entities,
+        },
+    }
+
+
+def callback_update(chat_id: int, data: str) -> Dict[str, Any]:
+    uid = next(_update_ids)
+    return {
+        "update_id": uid,
+        "callback_query": {
+            "id": str(uid),
+            "from": {**_user, "id": chat_id},
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": {
+                "message_id": uid,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": "Выберите дату:",
+            },
+        },
+    }
+
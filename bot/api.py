@@ -0,0 +1,105 @@
+"""Read-only HTTP API расписания для соседних сервисов.
+
+    GET /schedule?cinema=karo&date=2026-10-20        один кинотеатр на дату
+    GET /schedule?date=2026-10-20                    все кинотеатры на дату
+    GET /schedule?cinema=prada&days=7                окно из нескольких дней
+
+Данные берутся из того же кэша (кинотеатр, дата), что и у обработчиков: промах
+обслуживается одним скрейпом на всех клиентов и все реплики. Ответы со слабым ETag
+(повторный запрос с If-None-Match получает 304) и сжимаются gzip по Accept-Encoding
+(с Vary: Accept-Encoding).
+Даты — только из окна предзагрузки: сегодня и PREFETCH_DAYS - 1 дней вперёд.
+Включается API_PORT > 0.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from aiohttp import hdrs, web
+from aiohttp.web import ContentCoding
+
+from bot.config import settings
+from bot.utils.clock import clock
+from .sources import CINEMAS, schedule_cache
+
+logger = logging.getLogger(__name__)
+
+# Сколько ждать скрейпа при промахе, прежде чем ответить без этой даты
+SCRAPE_TIMEOUT_SEC = 30.0
+CACHE_MAX_AGE_SEC = 60
+
+
+def _bad_request(text: str) -> web.Response:
+    return web.json_response({"error": text}, status=400)
+
+
+async def _one(cinema: str, day: date) -> Optional[List[str]]:
+    try:
+        return await asyncio.wait_for(schedule_cache.get(cinema, day), timeout=SCRAPE_TIMEOUT_SEC)
+    except Exception as e:
+        logger.warning(f"API: нет расписания {cinema} на {day}: {e}")
+        return None
+
+
+async def schedule_handler(request: web.Request) -> web.StreamResponse:
+    query = request.query
+    cinema = query.get("cinema", "")
+    if cinema and cinema not in CINEMAS:
+        return _bad_request(f"unknown cinema, expected one of: {', '.join(CINEMAS)}")
+    try:
+        start = date.fromisoformat(query["date"]) if query.get("date") else clock.today()
+        days = int(query.get("days", "1"))
+    except ValueError:
+        return _bad_request("date must be YYYY-MM-DD and days an integer")
+    if not 1 <= days <= settings.PREFETCH_DAYS:
+        return _bad_request(f"days must be between 1 and {settings.PREFETCH_DAYS}")
+    # Только окно, которое бот и так держит в кэше: иначе клиент может заставить скрейпить любые даты
+    today = clock.today()
+    last = today + timedelta(days=settings.PREFETCH_DAYS - 1)
+    if start < today or start + timedelta(days=days - 1) > last:
+        return _bad_request(f"dates must be between {today.isoformat()} and {last.isoformat()}")
+
+    cinemas = [cinema] if cinema else list(CINEMAS)
+    window = [start + timedelta(days=i) for i in range(days)]
+    pairs = [(c, d) for c in cinemas for d in window]
+    results = await asyncio.gather(*(_one(c, d) for c, d in pairs))
+
+    schedule: Dict[str, Dict[str, Optional[List[str]]]] = {c: {} for c in cinemas}
+    for (c, d), titles in zip(pairs, results):
+        schedule[c][d.isoformat()] = titles
+    body = json.dumps({"schedule": schedule}, ensure_ascii=False, sort_keys=True).encode("utf-8")
+
+    # Тело одно, а кодировка зависит от Accept-Encoding: ETag слабый (совпадает для
+    # gzip и без сжатия), а Vary не даёт прокси отдать gzip тому, кто его не просил
+    opaque = '"' + hashlib.sha1(body).hexdigest() + '"'
+    headers = {"ETag": f"W/{opaque}", "Vary": hdrs.ACCEPT_ENCODING, "Cache-Control": f"max-age={CACHE_MAX_AGE_SEC}"}
+    # If-None-Match сравнивается слабо: префикс W/ не учитывается
+    if opaque in (t.strip().removeprefix("W/") for t in request.headers.get(hdrs.IF_NONE_MATCH, "").split(",")):
+        return web.Response(status=304, headers=headers)
+    # Неполный ответ (какой-то кинотеатр не ответил) клиенту кэшировать не стоит
+    if any(titles is None for titles in results):
+        headers["Cache-Control"] = "no-cache"
+    resp = web.Response(body=body, content_type="application/json", charset="utf-8", headers=headers)
+    # enable_compression() без аргумента выбирает deflate, если клиент принимает оба
+    if "gzip" in request.headers.get(hdrs.ACCEPT_ENCODING, "").lower():
+        resp.enable_compression(ContentCoding.gzip)
+    return resp
+
+
+def create_app() -> web.Application:
+    app = web.Application()
+    app.router.add_get("/schedule", schedule_handler)
+    return app
+
+
+async def start_api() -> web.AppRunner:
+    runner = web.AppRunner(create_app())
+    await runner.setup()
+    await web.TCPSite(runner, settings.API_HOST, settings.API_PORT).start()
+    logger.info(f"API расписания слушает {settings.API_HOST}:{settings.API_PORT}")
+    return runner
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Callable, List, Optional
+
+from bot.config import settings
+from .base import CoordinationBackend
+from .memory import MemoryBackend
+from .sqlite import SQLiteBackend
+
+__all__ = [
+    "CoordinationBackend", "MemoryBackend", "SQLiteBackend",
+    "INSTANCE_ID", "get_backend", "set_backend", "LeaderElector",
+]
+
+# Уникальный идентификатор реплики: хост, pid и случайный суффикс на случай перезапуска с тем же pid
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+_backend: Optional[CoordinationBackend] = None
+
+
+def get_backend() -> CoordinationBackend:
+    """Бэкенд по настройке COORDINATION_BACKEND: sqlite (по умолчанию) или memory"""
+    global _backend
+    if _backend is None:
+        if settings.COORDINATION_BACKEND == "memory":
+            _backend = MemoryBackend()
+        else:
+            _backend = SQLiteBackend(settings.COORDINATION_DB_PATH)
+    return _backend
+
+
+def set_backend(backend: CoordinationBackend) -> None:
+    """Подменяет бэкенд (тесты, бенчмарки)"""
+    global _backend
+    _backend = backend
+
+
+class LeaderElector:
+    """Выбор лидера через аренду с TTL: лидер продлевает её каждые ttl/3 секунд.
+
+    Если лидер пропал, аренда истекает, и её забирает следующая реплика.
+    Подписчики ``on_change`` узнают о получении и потере лидерства.
+    """
+
+    def __init__(self, backend: Optional[CoordinationBackend] = None, name: str = "scheduler", ttl: float = 30.0,
+                 owner: str = INSTANCE_ID):
+        self.backend = backend or get_backend()
+        self.owner = owner
+        self.name = name
+        self.ttl = ttl
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[bool], None]] = []
+
+    def on_change(self, listener: Callable[[bool], None]) -> None:
+        self._listeners.append(listener)
+
+    def _set_leader(self, leader: bool) -> None:
+        if leader == self.is_leader:
+            return
+        logging.info(f"Реплика {self.owner}: {'лидер' if leader else 'не лидер'} ({self.name})")
+        self.is_leader = leader
+        for listener in self._listeners:
+            try:
+                listener(leader)
+            except Exception:
+                logging.exception(f"Ошибка обработчика смены лидера {self.name}")
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+        if self.is_leader:
+            self._set_leader(False)
+            await asyncio.to_thread(self.backend.release_lease, self.name, self.owner)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                leader = await asyncio.to_thread(self.backend.acquire_lease, self.name, self.owner, self.ttl)
+            except Exception as e:
+                logging.error(f"Ошибка продления аренды {self.name}: {e}")
+                leader = False
+            self._set_leader(leader)
+            await asyncio.sleep(self.ttl / 3)
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Optional, Tuple
+
+
+class CoordinationBackend(ABC):
+    """Общее состояние нескольких реплик бота: аренды (лидерство, блокировки),
+    однократные «заявки» на запуск задач и общий кэш с TTL.
+
+    Все значения кэша — строки (JSON сериализует вызывающая сторона), время — unix timestamp.
+    """
+
+    @abstractmethod
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """Берёт или продлевает аренду; True, если после вызова она принадлежит ``owner``"""
+
+    @abstractmethod
+    def release_lease(self, name: str, owner: str) -> None:
+        """Отпускает аренду, если она принадлежит ``owner``"""
+
+    @abstractmethod
+    def claim_once(self, key: str, ttl: float) -> bool:
+        """True ровно для одной реплики, заявившей ``key`` в течение ``ttl`` секунд"""
+
+    @abstractmethod
+    def cache_get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Возвращает (значение, момент истечения) или None, если записи нет или она истекла"""
+
+    @abstractmethod
+    def cache_set(self, key: str, value: str, ttl: float) -> None:
+        """Сохраняет значение на ``ttl`` секунд"""
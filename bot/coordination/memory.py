@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from .base import CoordinationBackend
+
+
+class MemoryBackend(CoordinationBackend):
+    """Внутрипроцессная реализация: одна реплика или тесты.
+
+    Несколько ботов в одном процессе, использующих один экземпляр, ведут себя
+    как реплики с общим хранилищем.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._claims: Dict[str, float] = {}
+        self._cache: Dict[str, Tuple[str, float]] = {}
+
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            current = self._leases.get(name)
+            if current is None or current[0] == owner or current[1] <= now:
+                self._leases[name] = (owner, now + ttl)
+                return True
+            return False
+
+    def release_lease(self, name: str, owner: str) -> None:
+        with self._lock:
+            if self._leases.get(name, ("", 0))[0] == owner:
+                del self._leases[name]
+
+    def claim_once(self, key: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            if self._claims.get(key, 0) > now:
+                return False
+            self._claims[key] = now + ttl
+            return True
+
+    def cache_get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            item = self._cache.get(key)
+        if item is None or item[1] <= time.time():
+            return None
+        return item
+
+    def cache_set(self, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._cache[key] = (value, time.time() + ttl)
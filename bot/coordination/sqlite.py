@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from typing import Optional, Tuple
+
+from .base import CoordinationBackend
+
+
+class SQLiteBackend(CoordinationBackend):
+    """Реализация на общем SQLite-файле для реплик на одном хосте или общем томе.
+
+    Атомарность обеспечивает блокировка файла SQLite: изменения выполняются
+    в транзакциях ``BEGIN IMMEDIATE``.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS coord_leases (
+                    name TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS coord_claims (
+                    key TEXT PRIMARY KEY,
+                    expires_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS coord_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                );
+            ''')
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: транзакциями управляем сами
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT owner, expires_at FROM coord_leases WHERE name = ?", (name,)).fetchone()
+            if row is not None and row[0] != owner and row[1] > now:
+                conn.execute("COMMIT")
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO coord_leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                (name, owner, now + ttl),
+            )
+            conn.execute("COMMIT")
+            return True
+        finally:
+            conn.close()
+
+    def release_lease(self, name: str, owner: str) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM coord_leases WHERE name = ? AND owner = ?", (name, owner))
+        finally:
+            conn.close()
+
+    def claim_once(self, key: str, ttl: float) -> bool:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Заодно чистим просроченные заявки, чтобы таблица не росла
+            conn.execute("DELETE FROM coord_claims WHERE expires_at <= ?", (now,))
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO coord_claims (key, expires_at) VALUES (?, ?)",
+                (key, now + ttl),
+            )
+            conn.execute("COMMIT")
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    def cache_get(self, key: str) -> Optional[Tuple[str, float]]:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT value, expires_at FROM coord_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+            return (row[0], row[1]) if row else None
+        finally:
+            conn.close()
+
+    def cache_set(self, key: str, value: str, ttl: float) -> None:
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO coord_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+        finally:
+            conn.close()
@@ -1,25 +1,51 @@
-from datetime import date, datetime
-from typing import Literal
+from datetime import date, datetime, timedelta
 import asyncio
+import hashlib
+import html
+import os
+import re
+import tempfile
 
 import logging
 from aiogram import Router, F
 from aiogram.filters import Command, CommandObject
-from aiogram.types import Message, CallbackQuery
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.enums import ParseMode
+from aiogram.types import (
+    BufferedInputFile,
+    CallbackQuery,
+    FSInputFile,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+    Message,
+)
 from bot.config import settings
 
 from bot.storage import events_db
+from bot.storage.event_files import ImportStats, open_text, read_events, write_csv, write_ics
+from bot.utils.clock import clock
+from bot.utils.profiler import SamplingProfiler
+from bot.utils.reminder_times import format_offsets, parse_offsets
 from bot.utils.time_utils import is_date_in_future
-from bot.config import settings
-from .parsers.prada import fetch_prada_titles
-from .parsers.afisha_karo import fetch_karo_titles, fetch_karo_titles_quick
-from .parsers.kino_format import fetch_kinoformat_titles
-from .filters import filter_movie_titles
+from .sources import CINEMAS, CinemaKey, get_titles_for, index_cached, schedule_cache, search_index, title_index
+from . import reminders
+from .render import pack_messages, render_cache, split_message
+from .titles import FilmCluster, canonical_key
+from .middlewares import ScrapeThrottleMiddleware
 from .keyboards import main_menu_kb, cinema_picker_kb, date_picker_kb, cinema_date_picker_kb
 
 router = Router()
 
-CinemaKey = Literal["prada", "karo", "kinoformat"]
+TIME_RE = re.compile(r"^\d{1,2}:\d{2}$")
+# Больше Bot API скачать не даст
+MAX_IMPORT_BYTES = 20 * 1024 * 1024
+MAX_PROFILE_SEC = 300
+
+# Один экземпляр на оба типа апдейтов: общий лимит одновременных скрейпов
+scrape_throttle = ScrapeThrottleMiddleware()
+router.message.middleware(scrape_throttle)
+router.callback_query.middleware(scrape_throttle)
 
 
 def register_handlers(dp):
@@ -33,12 +59,22 @@ async def cmd_start(message: Message) -> None:
         "Доступные команды:\n"
         "/today — список фильмов на сегодня по всем кинотеатрам\n"
         "/schedule <кинотеатр> <дата> — например: /schedule prada 2025-09-28\n"
-        "Кинотеатры: prada, karo, kinoformat\n\n"
+        "Кинотеатры: prada, karo, kinoformat\n"
+        "/where <фильм> — где и когда идёт фильм\n"
+        "/find <запрос> — поиск фильмов по части названия\n\n"
+        "Уведомления о новых фильмах:\n"
+        "/subscribe <кинотеатр или слово> — все новинки кинотеатра или фильмы со словом в названии\n"
+        "/watch <фильм> — сообщить, когда фильм появится в расписании\n"
+        "/subscriptions — ваши подписки\n"
+        "/unsubscribe <кинотеатр, слово или фильм> — отписаться\n\n"
         "Для напоминаний о событиях:\n"
-        "/add_event <дата> <название> — добавить событие\n"
+        "/add_event <дата> [ЧЧ:ММ] <название> — добавить событие\n"
+        "/event_offsets <id> <7d,1d,1h> — когда напоминать о событии\n"
         "/setgroup — установить группу для напоминаний\n"
         "/list_events — посмотреть все события\n"
-        "/delete_event <id> — удалить событие\n\n"
+        "/delete_event <id> — удалить событие\n"
+        "/import_events — загрузить события из приложенного CSV/ICS\n"
+        "/export_events [csv|ics] — выгрузить события файлом\n\n"
         "Для отсчёта до Нового года:\n"
         "/newyear — показать стикер с отсчетом до Нового года\n"
         "/sticker — отправить стикер из пака\n\n"
@@ -59,52 +95,115 @@ def _parse_date_any(fmt: str) -> date | None:
         return None
 
 
-async def get_titles_for(cinema: CinemaKey, day: date, fast: bool = False) -> list[str]:
-    if cinema == "prada":
-        return filter_movie_titles(fetch_prada_titles(day))
-    if cinema == "karo":
-        if fast:
-            return await fetch_karo_titles_quick(day)
-        return await fetch_karo_titles(day)
-    if cinema == "kinoformat":
-        return await fetch_kinoformat_titles(day)
-    return []
+async def _send_texts(message: Message, texts: list[str]) -> None:
+    for text in texts:
+        await message.answer(text)
+
+
+CINEMA_SECTIONS: tuple[tuple[CinemaKey, str], ...] = (
+    ("prada", "Prada 3D"),
+    ("karo", "Karo 10 Реутов"),
+    ("kinoformat", "Киноцентр (Kino-Format)"),
+)
 
 
-async def _send_chunked(message: Message, header: str, items: list[str], chunk_size: int = 50) -> None:
-    if not items:
-        await message.answer(f"{header}\n— нет данных")
+async def _stream_all_cinemas(message: Message, d: date, suffix: str = "", timeout: float = 8.0) -> None:
+    """Отправляет расписание всех кинотеатров по мере готовности каждого.
+
+    Если всё уже в кэше — секции уходят сразу. Иначе сначала появляется сообщение
+    со статусами «загружается», секция каждого кинотеатра отправляется, как только
+    он ответил, а статус в первом сообщении обновляется.
+    """
+    peeked = await schedule_cache.peek_many((key, d) for key, _ in CINEMA_SECTIONS)
+    cached = {key: peeked[(key, d)] for key, _ in CINEMA_SECTIONS}
+    if all(titles is not None for titles in cached.values()):
+        # Всё готово — секции всех кинотеатров упаковываются в минимум сообщений
+        sections = (render_cache.section(key, d, f"<b>{title}{suffix}</b>", cached[key]) for key, title in CINEMA_SECTIONS)
+        await _send_texts(message, pack_messages(chunk for chunks in sections for chunk in chunks))
         return
-    lines: list[str] = items
-    for i in range(0, len(lines), chunk_size):
-        part = lines[i:i + chunk_size]
-        text = f"{header}\n" + "\n".join(part)
-        await message.answer(text)
-        header = "(продолжение)"
 
+    status = {key: "⏳ загружается…" for key, _ in CINEMA_SECTIONS}
 
-@router.message(Command("today"))
-async def cmd_today(message: Message) -> None:
-    d = date.today()
+    def render() -> str:
+        return "\n".join(f"<b>{title}</b>: {status[key]}" for key, title in CINEMA_SECTIONS)
 
-    async def with_timeout(coro, timeout=8.0, fallback=None):
+    placeholder = await message.answer(render())
+    lock = asyncio.Lock()
+
+    async def one(key: CinemaKey, title: str) -> None:
         try:
-            return await asyncio.wait_for(coro, timeout=timeout)
+            titles = await asyncio.wait_for(get_titles_for(key, d, fast=True), timeout=timeout)
+            status[key] = f"✅ {len(titles)}"
         except Exception:
-            return fallback or []
+            titles = []
+            status[key] = "⚠️ не удалось загрузить"
+        # Отправки и правки одного чата сериализуем, чтобы секции не перемешивались
+        async with lock:
+            await _send_texts(message, render_cache.section(key, d, f"<b>{title}{suffix}</b>", titles))
+            try:
+                await placeholder.edit_text(render())
+            except TelegramBadRequest:
+                pass
 
-    prada_task = with_timeout(get_titles_for("prada", d, fast=True))
-    karo_task = with_timeout(get_titles_for("karo", d, fast=True))
-    kino_task = with_timeout(get_titles_for("kinoformat", d, fast=True))
+    await asyncio.gather(*(one(key, title) for key, title in CINEMA_SECTIONS))
 
-    prada, karo, kinof = await asyncio.gather(prada_task, karo_task, kino_task)
 
-    await _send_chunked(message, "<b>Prada 3D</b>", prada)
-    await _send_chunked(message, "<b>Karo 10 Реутов</b>", karo)
-    await _send_chunked(message, "<b>Киноцентр (Kino-Format)</b>", kinof)
+@router.message(Command("today"), flags={"scrape": "today"})
+async def cmd_today(message: Message) -> None:
+    await _stream_all_cinemas(message, clock.today())
+
+
+async def _cached_window() -> tuple[str, str]:
+    """Границы окна предзагрузки (iso); заодно дотягивает в индексы то, что уже в кэше"""
+    today = clock.today()
+    days = [today + timedelta(days=i) for i in range(settings.PREFETCH_DAYS)]
+    # Только то, что уже в кэше: ответ не должен ждать сайты кинотеатров
+    await index_cached(days)
+    return today.isoformat(), days[-1].isoformat()
+
+
+def _film_text(film: FilmCluster, first: str, last: str) -> str | None:
+    lines = []
+    for key, title in CINEMA_SECTIONS:
+        dates = [iso for iso in film.dates(key) if first <= iso <= last]
+        if dates:
+            shown = ", ".join(date.fromisoformat(iso).strftime("%d.%m") for iso in dates)
+            lines.append(f"<b>{title}</b>: {shown}")
+    if not lines:
+        return None
+    return f"🎬 <b>{html.escape(film.title)}</b>\n" + "\n".join(lines)
+
+
+@router.message(Command("where"))
+async def cmd_where(message: Message, command: CommandObject) -> None:
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer("Использование: /where &lt;название фильма&gt;")
+        return
+    first, last = await _cached_window()
+    film = title_index.find(query)
+    text = _film_text(film, first, last) if film else None
+    if not text:
+        await message.answer(f"«{html.escape(query)}» не найден в расписании на ближайшие {settings.PREFETCH_DAYS} дн.")
+        return
+    await message.answer(text)
+
+
+@router.message(Command("find"))
+async def cmd_find(message: Message, command: CommandObject) -> None:
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer("Использование: /find &lt;часть названия&gt;")
+        return
+    first, last = await _cached_window()
+    texts = [t for t in (_film_text(f, first, last) for f in search_index.search(query)) if t]
+    if not texts:
+        await message.answer(f"По запросу «{html.escape(query)}» ничего не нашлось")
+        return
+    await _send_texts(message, pack_messages(texts))
 
 
-@router.message(Command("schedule"))
+@router.message(Command("schedule"), flags={"scrape": True})
 async def cmd_schedule(message: Message, command: CommandObject) -> None:
     if not command.args:
         await message.answer("Использование: /schedule &lt;кинотеатр&gt; &lt;YYYY-MM-DD|DD.MM.YYYY&gt;")
@@ -126,11 +225,11 @@ async def cmd_schedule(message: Message, command: CommandObject) -> None:
 
     fast = True
     titles = await get_titles_for(cinema_key, d, fast=fast)
-    await _send_chunked(message, f"<b>{cinema_key}</b>", titles)
+    await _send_texts(message, render_cache.section(cinema_key, d, f"<b>{cinema_key}</b>", titles))
 
 
 # Menu: text buttons
-@router.message(F.text == "Все на сегодня")
+@router.message(F.text == "Все на сегодня", flags={"scrape": "today"})
 async def menu_all_today(message: Message) -> None:
     await cmd_today(message)
 
@@ -146,46 +245,153 @@ async def menu_by_cinema(message: Message) -> None:
 
 
 # Callbacks
-@router.callback_query(F.data.startswith("pick:date:"))
+# Callback уже подтверждён в ScrapeThrottleMiddleware, поэтому q.answer() здесь не вызываем
+@router.callback_query(F.data.startswith("pick:date:"), flags={"scrape": True})
 async def cb_pick_date(q: CallbackQuery) -> None:
     iso = q.data.split(":")[-1]
     d = _parse_date_any(iso)
     if not d:
-        await q.answer("Некорректная дата")
+        await q.message.answer("Некорректная дата")
         return
-    # Fetch all for date
-    async def with_timeout(coro, timeout=8.0, fallback=None):
-        try:
-            return await asyncio.wait_for(coro, timeout=timeout)
-        except Exception:
-            return fallback or []
-    prada_task = with_timeout(get_titles_for("prada", d, fast=True))
-    karo_task = with_timeout(get_titles_for("karo", d, fast=True))
-    kino_task = with_timeout(get_titles_for("kinoformat", d, fast=True))
-    prada, karo, kinof = await asyncio.gather(prada_task, karo_task, kino_task)
-    await _send_chunked(q.message, f"<b>Prada 3D — {d}</b>", prada)
-    await _send_chunked(q.message, f"<b>Karo 10 Реутов — {d}</b>", karo)
-    await _send_chunked(q.message, f"<b>Киноцентр (Kino-Format) — {d}</b>", kinof)
-    await q.answer()
+    await _stream_all_cinemas(q.message, d, suffix=f" — {d}")
 
 
 @router.callback_query(F.data.startswith("pick:cinema:"))
 async def cb_pick_cinema(q: CallbackQuery) -> None:
     cinema = q.data.split(":")[-1]
+    if cinema not in CINEMAS:
+        await q.answer("Неизвестный кинотеатр")
+        return
     await q.message.answer("Выберите дату:", reply_markup=cinema_date_picker_kb(cinema))
     await q.answer()
 
 
-@router.callback_query(F.data.startswith("pick:cinemadate:"))
+@router.callback_query(F.data.startswith("pick:cinemadate:"), flags={"scrape": True})
 async def cb_pick_cinema_date(q: CallbackQuery) -> None:
     _, _, cinema, iso = q.data.split(":", 3)
+    # callback_data приходит от клиента: неизвестный кинотеатр не должен попасть в общий кэш и индексы
+    name = dict(CINEMA_SECTIONS).get(cinema)
+    if name is None:
+        await q.answer("Неизвестный кинотеатр")
+        return
     d = _parse_date_any(iso)
     if not d:
-        await q.answer("Некорректная дата")
+        await q.message.answer("Некорректная дата")
         return
     titles = await get_titles_for(cinema, d, fast=True)  # type: ignore[arg-type]
-    await _send_chunked(q.message, f"<b>{cinema} — {iso}</b>", titles)
-    await q.answer()
+    await _send_texts(q.message, render_cache.section(cinema, d, f"<b>{name} — {d.isoformat()}</b>", titles))
+
+
+# Inline-режим: @bot karo завтра, @bot дюна. Отвечаем только из кэша
+INLINE_CINEMAS: dict[str, CinemaKey] = {
+    "prada": "prada", "прада": "prada",
+    "karo": "karo", "каро": "karo",
+    "kinoformat": "kinoformat", "киноформат": "kinoformat", "кф": "kinoformat",
+}
+INLINE_DAYS = {"сегодня": 0, "today": 0, "завтра": 1, "tomorrow": 1, "послезавтра": 2}
+# Полный ответ Telegram может кэшировать подольше, неполный — чтобы повтор увидел прогретый кэш
+INLINE_CACHE_TIME = 300
+INLINE_CACHE_TIME_PARTIAL = 10
+# Не чаще этого фоновый прогрев одного ключа (если сайт лежит, не долбим его на каждый символ)
+INLINE_WARM_INTERVAL_SEC = 60.0
+_inline_warmed: dict[tuple[str, date], float] = {}
+_inline_tasks: set[asyncio.Task] = set()
+clock.on_rollover(lambda day: _inline_warmed.clear())
+
+
+def _inline_date(word: str, today: date) -> date | None:
+    if word in INLINE_DAYS:
+        return today + timedelta(days=INLINE_DAYS[word])
+    d = _parse_date_any(word)
+    if d is None:
+        try:
+            d = datetime.strptime(word, "%d.%m").date().replace(year=today.year)
+        except ValueError:
+            return None
+        if d < today:
+            d = d.replace(year=today.year + 1)
+    return d
+
+
+def _warm_in_background(cinema: CinemaKey, d: date) -> None:
+    """Запускает скрейп промаха фоном: сам inline-ответ его не ждёт"""
+    now = asyncio.get_running_loop().time()
+    if now - _inline_warmed.get((cinema, d), float("-inf")) < INLINE_WARM_INTERVAL_SEC:
+        return
+    _inline_warmed[(cinema, d)] = now
+
+    async def warm() -> None:
+        try:
+            await schedule_cache.refresh(cinema, d, fast=True, wait_for_peer=True)
+        except Exception as e:
+            logging.info(f"Фоновый прогрев {cinema} на {d} не удался: {e}")
+
+    task = asyncio.create_task(warm())
+    _inline_tasks.add(task)
+    task.add_done_callback(_inline_tasks.discard)
+
+
+def _article(result_id: str, title: str, description: str, text: str) -> InlineQueryResultArticle:
+    return InlineQueryResultArticle(
+        id=result_id,
+        title=title,
+        description=description,
+        input_message_content=InputTextMessageContent(message_text=text, parse_mode=ParseMode.HTML),
+    )
+
+
+@router.inline_query()
+async def inline_schedule(query: InlineQuery) -> None:
+    today = clock.today()
+    cinemas: list[CinemaKey] = []
+    day: date | None = None
+    rest: list[str] = []
+    for word in query.query.lower().split():
+        if word in INLINE_CINEMAS:
+            cinemas.append(INLINE_CINEMAS[word])
+        elif day is None and (d := _inline_date(word, today)) is not None:
+            day = d
+        else:
+            rest.append(word)
+
+    results: list[InlineQueryResultArticle] = []
+    complete = True
+    if rest:
+        # Поиск фильма по названию во всём окне
+        first, last = await _cached_window()
+        for film in search_index.search(" ".join(rest), limit=10):
+            text = _film_text(film, first, last)
+            if text:
+                cinemas_shown = ", ".join(name for key, name in CINEMA_SECTIONS if film.places.get(key))
+                film_id = hashlib.sha1(film.key.encode("utf-8")).hexdigest()[:16]
+                results.append(_article(f"film:{film_id}", film.title, cinemas_shown, text))
+    else:
+        d = day or today
+        if not 0 <= (d - today).days < settings.PREFETCH_DAYS:
+            d = today
+        sections = [(key, name) for key, name in CINEMA_SECTIONS if not cinemas or key in cinemas]
+        peeked = await schedule_cache.peek_many((key, d) for key, _ in sections)
+        for key, name in sections:
+            titles = peeked[(key, d)]
+            if titles is None:
+                complete = False
+                _warm_in_background(key, d)
+                continue
+            header = f"<b>{name} — {d.strftime('%d.%m')}</b>"
+            text = render_cache.section(key, d, header, titles)[0]
+            results.append(_article(f"{key}:{d.isoformat()}", f"{name} — {d.strftime('%d.%m')}", f"Фильмов: {len(titles)}", text))
+        if not complete and not results:
+            results.append(_article(
+                f"loading:{d.isoformat()}", "Расписание загружается…",
+                "Повторите запрос через несколько секунд",
+                "Расписание ещё загружается, попробуйте чуть позже",
+            ))
+
+    await query.answer(
+        results,
+        cache_time=INLINE_CACHE_TIME if complete and results else INLINE_CACHE_TIME_PARTIAL,
+        is_personal=False,
+    )
 
 
 # Команда для установки группы
@@ -205,12 +411,17 @@ async def set_group_handler(message: Message):
 # Команда добавления события
 @router.message(Command("add_event"))
 async def add_event_handler(message: Message):
-    # Получаем аргументы команды
-    text = message.text
-    parts = text.split(maxsplit=2)  # Разбиваем на 3 части: команда, дата, название
+    # Получаем аргументы команды: дата, необязательное время и название
+    parts = (message.text or "").split(maxsplit=3)
+    event_time = None
+    if len(parts) >= 4 and TIME_RE.match(parts[2]):
+        event_time = parts[2].zfill(5)
+        parts = [parts[0], parts[1], parts[3]]
+    else:
+        parts = (message.text or "").split(maxsplit=2)  # Разбиваем на 3 части: команда, дата, название
 
     if len(parts) < 3:
-        await message.answer("❌ Используйте формат: /add_event <дата> <название>\nПример: /add_event 2025-12-20 День рождения Вани", parse_mode=None)
+        await message.answer("❌ Используйте формат: /add_event <дата> [ЧЧ:ММ] <название>\nПример: /add_event 2025-12-20 18:30 День рождения Вани", parse_mode=None)
         return
 
     date_str = parts[1]
@@ -236,11 +447,107 @@ async def add_event_handler(message: Message):
             await message.answer("❌ Сначала установите группу через /setgroup")
             return
 
-        events_db.add_event(event_name, date_str, default_group)
-        await message.answer(f"✅ Событие '{event_name}' добавлено на {date_str}")
+        event_id = events_db.add_event(event_name, date_str, default_group, event_time=event_time)
+        reminders.notify_changed(event_id)
+        when = f"{date_str} {event_time}" if event_time else date_str
+        await message.answer(
+            f"✅ Событие #{event_id} '{html.escape(event_name)}' добавлено на {when}\n"
+            f"Напоминания: {settings.REMINDER_OFFSETS} до события (изменить: /event_offsets {event_id} 7d,1d,1h)"
+        )
     except Exception as e:
         await message.answer(f"❌ Ошибка при добавлении события: {str(e)}")
 
+# Команда настройки напоминаний события
+@router.message(Command("event_offsets"))
+async def event_offsets_handler(message: Message, command: CommandObject):
+    parts = (command.args or "").split(maxsplit=1)
+    if len(parts) < 2 or not parts[0].isdigit():
+        await message.answer("❌ Используйте формат: /event_offsets <id> <смещения>\nПример: /event_offsets 3 7d,1d,1h,0", parse_mode=None)
+        return
+    event_id = int(parts[0])
+    try:
+        offsets = format_offsets(parse_offsets(parts[1]))
+        fire_at = events_db.set_event_offsets(event_id, offsets)
+        reminders.notify_changed(event_id)
+    except (ValueError, events_db.DatabaseError) as e:
+        await message.answer(f"❌ {e}", parse_mode=None)
+        return
+    if fire_at is None:
+        await message.answer(f"✅ Напоминания события #{event_id}: {offsets} (все уже в прошлом)")
+    else:
+        nearest = datetime.fromtimestamp(fire_at, clock.tz).strftime("%d.%m.%Y %H:%M")
+        await message.answer(f"✅ Напоминания события #{event_id}: {offsets}, ближайшее — {nearest}")
+
+# Импорт событий из файла (CSV или ICS), приложенного к команде или в ответ на файл
+@router.message(Command("import_events"))
+async def import_events_handler(message: Message):
+    document = message.document or (message.reply_to_message.document if message.reply_to_message else None)
+    if document is None:
+        await message.answer(
+            "❌ Приложите файл .csv или .ics с подписью /import_events (или ответьте командой на файл)\n"
+            'CSV: date,name[,time[,offsets]], например 2025-12-20,День рождения Вани,18:30,"7d,1d"',
+            parse_mode=None,
+        )
+        return
+    if document.file_size and document.file_size > MAX_IMPORT_BYTES:
+        await message.answer("❌ Файл больше 20 МБ — Telegram не даст боту его скачать")
+        return
+    default_group = events_db.get_default_group()
+    if default_group == 0:
+        await message.answer("❌ Сначала установите группу через /setgroup")
+        return
+
+    filename = document.file_name or "events.csv"
+    stats = ImportStats()
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(filename)[1])
+    os.close(fd)
+    try:
+        # Файл скачивается на диск и читается построчно — память не зависит от размера
+        await message.bot.download(document, destination=path)
+
+        def run() -> int:
+            with open_text(path) as f:
+                return events_db.import_events(read_events(f, filename, stats), default_group)
+
+        added = await asyncio.to_thread(run)
+    except Exception as e:
+        await message.answer(f"❌ Ошибка при импорте: {html.escape(str(e))}")
+        return
+    finally:
+        os.remove(path)
+
+    reminders.notify_bulk_changed()
+    lines = [f"✅ Импортировано событий: {added} из {stats.read}"]
+    if stats.skipped_past:
+        lines.append(f"Пропущено прошедших: {stats.skipped_past}")
+    if stats.invalid:
+        lines.append(f"С ошибками: {stats.invalid}")
+        lines.extend(html.escape(e) for e in stats.errors)
+    await message.answer("\n".join(lines))
+
+# Выгрузка всех событий файлом: /export_events [csv|ics]
+@router.message(Command("export_events"))
+async def export_events_handler(message: Message, command: CommandObject):
+    fmt = (command.args or "csv").strip().lower()
+    if fmt not in ("csv", "ics"):
+        await message.answer("❌ Используйте формат: /export_events [csv|ics]", parse_mode=None)
+        return
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        def run() -> int:
+            with open(path, "w", encoding="utf-8", newline="") as out:
+                write = write_ics if fmt == "ics" else write_csv
+                return write(out, events_db.iter_events())
+
+        count = await asyncio.to_thread(run)
+        if not count:
+            await message.answer("📝 Нет добавленных событий")
+            return
+        await message.answer_document(FSInputFile(path, filename=f"events.{fmt}"), caption=f"📝 Событий: {count}")
+    finally:
+        os.remove(path)
+
 # Команда списка событий
 @router.message(Command("list_events"))
 async def list_events_handler(message: Message):
@@ -252,7 +559,7 @@ async def list_events_handler(message: Message):
     text = "📝 Список событий:\n"
     for event in events:
         event_id, name, event_date, group_chat_id = event
-        text += f"• {event_id}: {name} ({event_date})\n"
+        text += f"• {event_id}: {html.escape(name)} ({event_date})\n"
 
     await message.answer(text)
 
@@ -267,10 +574,99 @@ async def delete_event_handler(message: Message):
     try:
         event_id = int(parts[1])
         events_db.delete_event(event_id)
+        reminders.notify_changed(event_id)
         await message.answer(f"✅ Событие #{event_id} удалено")
     except Exception as e:
         await message.answer(f"❌ Ошибка при удалении события: {str(e)}")
 
+SUBSCRIPTION_KINDS = {"cinema": "кинотеатр", "keyword": "слово", "title": "фильм"}
+
+
+def _subscription_target(kind: str, text: str) -> tuple[str, str] | None:
+    value = text.strip().lower()
+    if kind == "keyword" and value in CINEMAS:
+        return "cinema", value
+    key = canonical_key(text)
+    return (kind, key) if key else None
+
+
+@router.message(Command("subscribe"))
+async def subscribe_handler(message: Message, command: CommandObject):
+    target = _subscription_target("keyword", command.args or "")
+    if not target:
+        await message.answer("❌ Используйте формат: /subscribe <prada|karo|kinoformat или слово из названия>", parse_mode=None)
+        return
+    kind, value = target
+    added = events_db.add_subscription(message.chat.id, kind, value)
+    label = SUBSCRIPTION_KINDS[kind]
+    await message.answer(f"✅ Подписка на {label} «{html.escape(value)}» оформлена" if added else "Такая подписка уже есть")
+
+
+@router.message(Command("watch"))
+async def watch_handler(message: Message, command: CommandObject):
+    target = _subscription_target("title", command.args or "")
+    if not target:
+        await message.answer("❌ Используйте формат: /watch <название фильма>", parse_mode=None)
+        return
+    added = events_db.add_subscription(message.chat.id, *target)
+    await message.answer(f"✅ Сообщу, когда «{html.escape(target[1])}» появится в расписании" if added else "Этот фильм уже в списке")
+
+
+@router.message(Command("subscriptions"))
+async def subscriptions_handler(message: Message):
+    rows = events_db.get_subscriptions(message.chat.id)
+    if not rows:
+        await message.answer("📝 Подписок нет. Добавить: /subscribe или /watch")
+        return
+    text = "📝 Ваши подписки:\n" + "\n".join(f"• {SUBSCRIPTION_KINDS.get(kind, kind)}: {html.escape(value)}" for kind, value in rows)
+    await message.answer(text)
+
+
+@router.message(Command("unsubscribe"))
+async def unsubscribe_handler(message: Message, command: CommandObject):
+    args = command.args or ""
+    # Пользователь не обязан помнить, как именно подписывался
+    candidates = {_subscription_target("keyword", args), _subscription_target("title", args)}
+    removed = sum(events_db.delete_subscription(message.chat.id, *t) for t in candidates if t)
+    await message.answer("✅ Подписка удалена" if removed else "❌ Такой подписки нет, см. /subscriptions", parse_mode=None)
+
+# Профилирование работающего бота — только для владельца
+@router.message(Command("profile"))
+async def profile_handler(message: Message, command: CommandObject):
+    if not settings.OWNER_CHAT_ID or message.chat.id != settings.OWNER_CHAT_ID:
+        return
+    try:
+        seconds = int(command.args or 30)
+    except ValueError:
+        seconds = 0
+    if not 1 <= seconds <= MAX_PROFILE_SEC:
+        await message.answer(f"❌ Используйте формат: /profile <секунды от 1 до {MAX_PROFILE_SEC}>", parse_mode=None)
+        return
+
+    await message.answer(f"⏱ Профилирую {seconds} с…")
+    result = await asyncio.to_thread(SamplingProfiler().run, seconds)
+    if result is None:
+        await message.answer("❌ Профилирование уже идёт")
+        return
+
+    own, inclusive = result.hotspots()
+    busy = result.busy_samples() or 1
+    lines = [
+        f"<b>Профиль за {seconds} с</b>: {result.samples} снимков, "
+        f"в работе {result.busy_samples()} стек(ов) из {sum(result.threads.values())}",
+        "",
+        "<b>Собственное время</b>:",
+    ]
+    lines += [f"{count * 100 / busy:5.1f}% {html.escape(frame)}" for frame, count in own]
+    lines += ["", "<b>Код бота, включительно</b>:"]
+    lines += [f"{count * 100 / busy:5.1f}% {html.escape(frame)}" for frame, count in inclusive]
+    await _send_texts(message, split_message(lines[0], lines[1:]))
+    stamp = clock.now().strftime("%Y%m%d-%H%M%S")
+    await message.answer_document(
+        BufferedInputFile(result.collapsed().encode("utf-8"), filename=f"profile-{stamp}.folded"),
+        caption="Collapsed stacks: flamegraph.pl, speedscope.app или inferno",
+    )
+
 # Команда отправки стикера
 @router.message(Command("sticker"))
 async def send_sticker_handler(message: Message):
@@ -294,7 +690,7 @@ async def get_sticker_id(message: Message):
 @router.message(Command("newyear"))
 async def send_newyear_sticker(message: Message):
     new_year = date(2026, 1, 1)
-    today = date.today()
+    today = clock.today()
     days_remaining = (new_year - today).days
 
     if days_remaining > 100:
@@ -315,9 +711,12 @@ async def send_newyear_sticker(message: Message):
 async def events_menu(message: Message):
     text = (
         "Меню событий:\n"
-        "/add_event <дата> <название> — добавить событие\n"
+        "/add_event <дата> [ЧЧ:ММ] <название> — добавить событие\n"
+        "/event_offsets <id> <7d,1d,1h> — когда напоминать о событии\n"
         "/list_events — посмотреть все события\n"
         "/delete_event <id> — удалить событие\n"
+        "/import_events — загрузить события из приложенного CSV/ICS\n"
+        "/export_events [csv|ics] — выгрузить события файлом\n"
         "/setgroup — установить группу для напоминаний"
     )
     await message.answer(text, parse_mode=None)
\ No newline at end of file
@@ -1,9 +1,17 @@
 from __future__ import annotations
 
 from datetime import date, timedelta
+from functools import lru_cache
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 
+from bot.utils.clock import clock
 
+# Клавиатуры — неизменяемые (frozen) модели aiogram, поэтому один экземпляр
+# безопасно переиспользовать во всех чатах. Статические строятся один раз,
+# календарные — один раз на московский день (день входит в ключ кэша).
+
+
+@lru_cache(maxsize=None)
 def main_menu_kb() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
         keyboard=[
@@ -17,6 +25,7 @@ def main_menu_kb() -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache(maxsize=None)
 def cinema_picker_kb() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
@@ -27,26 +36,26 @@ def cinema_picker_kb() -> InlineKeyboardMarkup:
     )
 
 
-def date_picker_kb(prefix: str = "pick:date:", days: int = 7) -> InlineKeyboardMarkup:
-    today = date.today()
+def _date_label(i: int, d: date) -> str:
+    return "Сегодня" if i == 0 else ("Завтра" if i == 1 else d.strftime("%d.%m.%Y"))
+
+
+@lru_cache(maxsize=16)
+def _date_picker(today: date, prefix: str, days: int) -> InlineKeyboardMarkup:
     rows = []
     for i in range(days):
         d = today + timedelta(days=i)
-        label = "Сегодня" if i == 0 else ("Завтра" if i == 1 else d.strftime("%d.%m.%Y"))
-        rows.append([InlineKeyboardButton(text=label, callback_data=f"{prefix}{d.isoformat()}")])
+        rows.append([InlineKeyboardButton(text=_date_label(i, d), callback_data=f"{prefix}{d.isoformat()}")])
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
+def date_picker_kb(prefix: str = "pick:date:", days: int = 7) -> InlineKeyboardMarkup:
+    return _date_picker(clock.today(), prefix, days)
+
+
 def cinema_date_picker_kb(cinema: str, days: int = 7) -> InlineKeyboardMarkup:
-    today = date.today()
-    rows = []
-    for i in range(days):
-        d = today + timedelta(days=i)
-        label = "Сегодня" if i == 0 else ("Завтра" if i == 1 else d.strftime("%d.%m.%Y"))
-        rows.append([
-            InlineKeyboardButton(
-                text=label,
-                callback_data=f"pick:cinemadate:{cinema}:{d.isoformat()}",
-            )
-        ])
-    return InlineKeyboardMarkup(inline_keyboard=rows)
+    return _date_picker(clock.today(), f"pick:cinemadate:{cinema}:", days)
+
+
+# Вчерашние календари больше не понадобятся
+clock.on_rollover(lambda day: _date_picker.cache_clear())
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapeThrottleMiddleware(BaseMiddleware):
+    """Защищает дорогие обработчики (помеченные флагом ``scrape``) от повторов и перегрузки.
+
+    - одинаковый запрос из того же чата, пока предыдущий ещё выполняется, не запускается
+      второй раз: ответ и так придёт в этот чат;
+    - повтор того же запроса чаще, чем раз в ``repeat_window`` секунд, отбрасывается;
+    - одновременно выполняется не больше ``max_concurrent`` таких обработчиков, остальные ждут;
+    - callback-запрос подтверждается сразу, чтобы у кнопки не висели «часики».
+
+    Значение флага — имя запроса: ``flags={"scrape": "today"}`` делает /today и кнопку
+    «Все на сегодня» одним и тем же запросом. При ``True`` ключом служит текст или data.
+    """
+
+    def __init__(self, max_concurrent: Optional[int] = None, repeat_window: Optional[float] = None):
+        self.max_concurrent = max_concurrent or settings.SCRAPE_MAX_CONCURRENT
+        self.repeat_window = settings.THROTTLE_WINDOW_SEC if repeat_window is None else repeat_window
+        self._sem = asyncio.Semaphore(self.max_concurrent)
+        self._inflight: Set[Tuple[int, str]] = set()
+        self._last: Dict[Tuple[int, str], float] = {}
+
+    @staticmethod
+    def _request_key(event: TelegramObject, flag: Any) -> Optional[Tuple[int, str]]:
+        if isinstance(event, CallbackQuery):
+            chat_id = event.message.chat.id if event.message else event.from_user.id
+            return chat_id, flag if isinstance(flag, str) else (event.data or "")
+        if isinstance(event, Message):
+            return event.chat.id, flag if isinstance(flag, str) else (event.text or "")
+        return None
+
+    def _forget_old(self, now: float) -> None:
+        # Словарь последних запросов не должен расти бесконечно
+        if len(self._last) > 10000:
+            self._last = {k: t for k, t in self._last.items() if now - t < self.repeat_window}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        flag = get_flag(data, "scrape")
+        key = self._request_key(event, flag) if flag else None
+        if key is None:
+            return await handler(event, data)
+
+        if isinstance(event, CallbackQuery):
+            try:
+                await event.answer()
+            except Exception as e:
+                logger.debug(f"Не удалось подтвердить callback: {e}")
+
+        now = time.monotonic()
+        if key in self._inflight:
+            logger.debug(f"Запрос {key} уже выполняется, повтор объединён с ним")
+            return None
+        if now - self._last.get(key, float("-inf")) < self.repeat_window:
+            logger.debug(f"Запрос {key} повторён слишком быстро, пропускаем")
+            return None
+        self._last[key] = now
+        self._forget_old(now)
+
+        self._inflight.add(key)
+        try:
+            async with self._sem:
+                return await handler(event, data)
+        finally:
+            self._inflight.discard(key)
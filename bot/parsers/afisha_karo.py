@@ -6,12 +6,16 @@ import requests
 from bs4 import BeautifulSoup
 
 from ..filters import filter_movie_titles
+from ..storage.archive import archive_page, get_archive
+from ..utils.clock import clock
+from .pool import parse_html
 
 BASE_YA = "https://afisha.yandex.ru/moscow/cinema/places/karo-10-reutov"
 
 
 def _build_yandex_url(day: date) -> str:
-    today = date.today()
+    # «Сегодня» и «завтра» у Афиши московские, а не по часам сервера
+    today = clock.today()
     if day == today:
         return f"{BASE_YA}?place-schedule-preset=today"
     if day == date.fromordinal(today.toordinal() + 1):
@@ -84,13 +88,27 @@ async def _fetch_with_playwright_async(url: str) -> str:
             await browser.close()
 
 
+def _check_page(url: str, html: str) -> None:
+    # Капча или пустая страница — это «не удалось скачать», а не «фильмов нет»
+    if not html:
+        raise RuntimeError(f"Пустая страница {url}")
+    if _has_smartcaptcha(html):
+        raise RuntimeError(f"SmartCaptcha на {url}")
+
+
+async def _archive(day: date, url: str, html: str) -> None:
+    if html and get_archive() is not None:
+        await asyncio.to_thread(archive_page, "karo", day, url, html)
+
+
 async def fetch_karo_titles_quick(day: date) -> List[str]:
     url = _build_yandex_url(day)
     html = await asyncio.to_thread(_fetch_with_requests, url)
     if _has_smartcaptcha(html):
         html = await _fetch_with_playwright_async(url)
-    titles = _parse_titles_from_html(html) if html else []
-    return filter_movie_titles(titles)
+    await _archive(day, url, html)
+    _check_page(url, html)
+    return filter_movie_titles(await parse_html(_parse_titles_from_html, html))
 
 
 async def fetch_karo_titles(day: date) -> List[str]:
@@ -100,5 +118,6 @@ async def fetch_karo_titles(day: date) -> List[str]:
     if not html:
         # Fallback to requests
         html = await asyncio.to_thread(_fetch_with_requests, url)
-    titles = _parse_titles_from_html(html) if html else []
-    return filter_movie_titles(titles)
+    await _archive(day, url, html)
+    _check_page(url, html)
+    return filter_movie_titles(await parse_html(_parse_titles_from_html, html))
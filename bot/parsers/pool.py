@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _warm_worker() -> None:
+    # Выполняется один раз в каждом процессе пула: bs4 и lxml импортируются заранее,
+    # и первый разбор не платит за импорт
+    from bs4 import BeautifulSoup
+    BeautifulSoup("<p></p>", "lxml")
+
+
+def _ping() -> None:
+    return None
+
+
+def get_executor() -> Optional[ProcessPoolExecutor]:
+    """Пул процессов для разбора HTML или None, если PARSE_WORKERS=0"""
+    global _executor
+    if _executor is None and settings.PARSE_WORKERS > 0:
+        # spawn, а не fork: форкать процесс с циклом событий и потоками небезопасно
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+        )
+    return _executor
+
+
+def start_parse_pool() -> None:
+    """Поднимает и прогревает процессы пула заранее, не дожидаясь первого запроса"""
+    executor = get_executor()
+    if executor is None:
+        return
+    for _ in range(settings.PARSE_WORKERS):
+        executor.submit(_ping)
+    logger.info(f"Пул разбора HTML: {settings.PARSE_WORKERS} процесс(ов)")
+
+
+def shutdown_parse_pool() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def parse_html(func: Callable[..., T], html: str, *args) -> T:
+    """Разбирает страницу ``func(html, *args)`` в пуле процессов, если он включён.
+
+    ``func`` должна быть функцией верхнего уровня модуля и возвращать компактный результат
+    (списки строк): через границу процессов едет только HTML туда и названия обратно.
+    Без пула разбор выполняется на месте, как раньше.
+    """
+    executor = get_executor()
+    if executor is None:
+        return func(html, *args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, func, html, *args)
@@ -1,10 +1,34 @@
 from datetime import date, datetime
-from typing import List, Set
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup, Tag
 
+from ..storage.archive import archive_page
+from ..utils.clock import clock
+from .pool import parse_html
+
 BASE_URL = "https://prada3d.ru/"
 
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
+    "Accept-Language": "ru-RU,ru;q=0.9",
+}
+
+# Одна сессия на процесс: keep-alive соединения к prada3d.ru переиспользуются между запросами
+_session: Optional[requests.Session] = None
+
+
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.headers.update(HEADERS)
+        _session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+        _session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+    return _session
+
 
 def _build_url(day: date) -> str:
     return f"{BASE_URL}?date={day.isoformat()}&city=balashiha&facility=prada-3d"
@@ -57,16 +81,15 @@ def _page_matches_date_or_listed(soup: BeautifulSoup, day: date) -> bool:
     return False
 
 
-def fetch_prada_titles(day: date) -> List[str]:
+def _fetch_html(day: date) -> str:
     url = _build_url(day)
-    resp = requests.get(url, timeout=20, headers={
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
-        "Accept-Language": "ru-RU,ru;q=0.9",
-    })
+    resp = _get_session().get(url, timeout=20)
     resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "lxml")
+    archive_page("prada", day, url, resp.text)
+    return resp.text
 
-    today = date.today()
+
+def _titles_from_soup(soup: BeautifulSoup, day: date, today: date) -> List[str]:
     if day != today and not _page_matches_date_or_listed(soup, day):
         return []
 
@@ -76,3 +99,54 @@ def fetch_prada_titles(day: date) -> List[str]:
         if text:
             titles.append(text)
     return titles
+
+
+def parse_prada_html(html: str, day: date, today: date) -> List[str]:
+    return _titles_from_soup(BeautifulSoup(html, "lxml"), day, today)
+
+
+def parse_prada_page(html: str, day: date, today: date) -> Tuple[List[str], List[str]]:
+    """Названия и список дат, на которые сайт даёт ссылки, за один разбор страницы"""
+    soup = BeautifulSoup(html, "lxml")
+    return _titles_from_soup(soup, day, today), sorted(_available_dates(soup))
+
+
+async def fetch_prada_titles_async(day: date) -> List[str]:
+    # Сеть — в потоке, разбор — в пуле процессов (если включён PARSE_WORKERS)
+    html = await asyncio.to_thread(_fetch_html, day)
+    return await parse_html(parse_prada_html, html, day, clock.today())
+
+
+async def fetch_prada_titles_batch(days: Iterable[date], concurrency: int = 4) -> Dict[date, List[str]]:
+    """Расписание на несколько дат сразу.
+
+    Первая страница заодно даёт список дат, на которые у сайта есть расписание:
+    остальные даты запрашиваются параллельно (через общую сессию) только если
+    они в этом списке, для прочих сразу возвращается пустой список.
+    """
+    days = sorted(set(days))
+    if not days:
+        return {}
+    today = clock.today()
+    first, rest = days[0], days[1:]
+
+    html = await asyncio.to_thread(_fetch_html, first)
+    titles, available = await parse_html(parse_prada_page, html, first, today)
+    result: Dict[date, List[str]] = {first: titles}
+
+    # Если ссылок на даты не нашлось (сменилась вёрстка), запрашиваем всё
+    listed = set(available)
+    to_fetch = [d for d in rest if not listed or d.isoformat() in listed]
+    for d in rest:
+        if d not in to_fetch:
+            result[d] = []
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(day: date) -> None:
+        async with sem:
+            page = await asyncio.to_thread(_fetch_html, day)
+        result[day] = await parse_html(parse_prada_html, page, day, today)
+
+    await asyncio.gather(*(one(d) for d in to_fetch))
+    return result
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import html
+import logging
+import time
+from datetime import datetime
+from typing import List, Optional, Set, Tuple
+
+from aiogram import Bot
+
+from bot.config import settings
+from bot.storage import events_db
+from bot.utils.clock import clock
+from bot.utils.reminder_times import event_moment, next_fire_at
+
+logger = logging.getLogger(__name__)
+
+# На сколько вперёд напоминания подгружаются из БД в кучу за один запрос
+LOAD_HORIZON_SEC = 6 * 3600
+# Дольше этого не спим даже при пустой куче: часы могут сдвинуться
+MAX_SLEEP_SEC = 3600.0
+
+
+def reminder_text(name: str, event_date: str, event_time: Optional[str], fire_at: float) -> str:
+    name = html.escape(name)
+    moment = event_moment(event_date, event_time)
+    fired = datetime.fromtimestamp(fire_at, clock.tz)
+    days_remaining = (moment.date() - fired.date()).days
+    if event_time:
+        minutes = round((moment - fired).total_seconds() / 60)
+        if minutes <= 0:
+            return f"🎉 Начинается {name}!"
+        if days_remaining == 0:
+            left = f"{minutes // 60} ч {minutes % 60} мин" if minutes >= 60 else f"{minutes} мин"
+            return f"⏰ Через {left}: {name} (в {event_time})"
+    if days_remaining <= 0:
+        return f"🎉 СЕГОДНЯ {name}!"
+    if days_remaining == 1:
+        return f"⏳ До {name} остался 1 день!"
+    return f"⏳ До {name} осталось {days_remaining} дней!"
+
+
+class ReminderService:
+    """Точные напоминания о событиях без опроса таблицы.
+
+    В куче лежат (время, id события) ближайших напоминаний: они подгружаются из БД
+    окнами по LOAD_HORIZON_SEC через индекс по next_fire_at, а новое событие
+    добавляется в кучу сразу (``notify_changed``). Сервис спит до ближайшего
+    напоминания. Перед отправкой напоминание атомарно отмечается в БД
+    (``events_db.claim_reminder``), поэтому после рестарта или на второй реплике
+    оно не повторится. Устаревшие записи кучи (событие удалено или перенесено)
+    отбрасываются при извлечении сверкой с БД.
+    """
+
+    def __init__(self, bot: Bot, horizon: float = LOAD_HORIZON_SEC):
+        self.bot = bot
+        self.horizon = horizon
+        self._heap: List[Tuple[float, int]] = []
+        self._queued: Set[Tuple[float, int]] = set()
+        self._loaded_until = float("-inf")
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    def _push(self, fire_at: float, event_id: int) -> None:
+        if (fire_at, event_id) not in self._queued:
+            self._queued.add((fire_at, event_id))
+            heapq.heappush(self._heap, (fire_at, event_id))
+
+    def _load_more(self, now: float) -> None:
+        until = max(now, self._loaded_until) + self.horizon
+        # Первая загрузка берёт и пропущенные за время простоя напоминания
+        for event_id, fire_at in events_db.get_due_reminders(self._loaded_until, until):
+            self._push(fire_at, event_id)
+        self._loaded_until = until
+
+    def notify_changed(self, event_id: int) -> None:
+        """Событие добавлено, изменено или удалено: куча сразу приводится в соответствие с БД"""
+        row = events_db.get_event(event_id)
+        fire_at = row[6] if row else None
+        # Устаревшие записи события убираем сразу, чтобы сервис не просыпался впустую
+        stale = {item for item in self._queued if item[1] == event_id and item[0] != fire_at}
+        if stale:
+            self._queued -= stale
+            self._heap = [item for item in self._heap if item not in stale]
+            heapq.heapify(self._heap)
+        if fire_at is not None and fire_at <= self._loaded_until:
+            self._push(fire_at, event_id)
+        if stale or fire_at is not None:
+            self._wake.set()
+
+    def refresh(self) -> None:
+        """Досматривает уже загруженное окно после массового изменения таблицы (импорт)"""
+        for event_id, fire_at in events_db.get_due_reminders(float("-inf"), self._loaded_until):
+            self._push(fire_at, event_id)
+        self._wake.set()
+
+    async def _fire(self, fire_at: float, event_id: int, now: float) -> None:
+        row = events_db.get_event(event_id)
+        if row is None or row[6] != fire_at:
+            return  # событие удалено или его напоминания пересчитаны
+        _, name, event_date, event_time, offsets, group_chat_id, _ = row
+        # Если пропущено несколько напоминаний подряд, уходит одно, следующее — уже будущее
+        next_at = next_fire_at(event_date, event_time, offsets, max(fire_at, now))
+        if not events_db.claim_reminder(event_id, fire_at, next_at):
+            return
+        if next_at is not None and next_at <= self._loaded_until:
+            self._push(next_at, event_id)
+        if now - fire_at > settings.MISFIRE_GRACE_MIN * 60:
+            logger.info(f"Напоминание о событии #{event_id} опоздало на {now - fire_at:.0f} с, пропускаем")
+            return
+
+        chat_id = group_chat_id or events_db.get_default_group()
+        if not chat_id:
+            return
+        try:
+            await self.bot.send_message(chat_id=chat_id, text=reminder_text(name, event_date, event_time, fire_at))
+        except Exception as e:
+            logger.error(f"Не удалось отправить напоминание о событии #{event_id}: {e}")
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            now = time.time()
+            if not self._heap or self._heap[0][0] > self._loaded_until:
+                self._load_more(now)
+            while self._heap and self._heap[0][0] <= now:
+                fire_at, event_id = heapq.heappop(self._heap)
+                self._queued.discard((fire_at, event_id))
+                try:
+                    await self._fire(fire_at, event_id, now)
+                except Exception:
+                    logger.exception(f"Ошибка напоминания о событии #{event_id}")
+            wake_at = min(self._heap[0][0] if self._heap else self._loaded_until, self._loaded_until)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=min(max(0.0, wake_at - time.time()), MAX_SLEEP_SEC))
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="event-reminders")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            # wait_for может проглотить отмену, если событие пробуждения пришло в тот же
+            # момент: тогда цикл завершится по флагу на следующей итерации
+            self._stopping = True
+            self._wake.set()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_service: Optional[ReminderService] = None
+
+
+def start_reminders(bot: Bot) -> ReminderService:
+    global _service
+    _service = ReminderService(bot)
+    _service.start()
+    return _service
+
+
+def notify_changed(event_id: int) -> None:
+    """Вызывается обработчиками после добавления, удаления события или смены его напоминаний"""
+    if _service is not None:
+        _service.notify_changed(event_id)
+
+
+def notify_bulk_changed() -> None:
+    """Вызывается после массового добавления событий"""
+    if _service is not None:
+        _service.refresh()
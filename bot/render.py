@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from datetime import date
+from html import escape
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from bot.utils.clock import clock
+
+# Лимит Telegram на текст сообщения — в UTF-16 code units, а не в символах Python
+MESSAGE_LIMIT = 4096
+CONTINUATION = "(продолжение)"
+EMPTY = "— нет данных"
+
+
+def utf16_len(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _cut(line: str, limit: int) -> str:
+    # Строка длиннее целого сообщения (на практике не бывает) обрезается по лимиту
+    while utf16_len(line) > limit:
+        line = line[:max(1, len(line) - (utf16_len(line) - limit))]
+    return line
+
+
+def split_message(header: str, lines: Sequence[str], limit: int = MESSAGE_LIMIT,
+                  continuation: str = CONTINUATION) -> List[str]:
+    """Раскладывает строки по сообщениям, заполняя каждое до лимита.
+
+    Первое сообщение начинается с ``header``, следующие — с ``continuation``.
+    Строки уже должны быть экранированы для HTML.
+    """
+    if not lines:
+        return [f"{header}\n{EMPTY}"]
+    chunks: List[str] = []
+    current, size = header, utf16_len(header)
+    for line in lines:
+        line = _cut(line, limit - utf16_len(continuation) - 1)
+        extra = 1 + utf16_len(line)
+        if size + extra > limit:
+            chunks.append(current)
+            current, size = continuation, utf16_len(continuation)
+        current += "\n" + line
+        size += extra
+    chunks.append(current)
+    return chunks
+
+
+def pack_messages(chunks: Iterable[str], limit: int = MESSAGE_LIMIT, sep: str = "\n\n") -> List[str]:
+    """Склеивает готовые куски (например, секции нескольких кинотеатров) в минимум сообщений"""
+    packed: List[str] = []
+    size = 0
+    for chunk in chunks:
+        length = utf16_len(chunk)
+        if packed and size + utf16_len(sep) + length <= limit:
+            packed[-1] += sep + chunk
+            size += utf16_len(sep) + length
+        else:
+            packed.append(chunk)
+            size = length
+    return packed
+
+
+class RenderCache:
+    """Готовые сообщения секций расписания по (кинотеатр, дата, заголовок).
+
+    Названия экранируются и раскладываются по сообщениям один раз на версию
+    расписания: пока список фильмов тот же, все чаты получают те же строки.
+    """
+
+    def __init__(self) -> None:
+        self._sections: Dict[Tuple[str, str, str], Tuple[Tuple[str, ...], List[str]]] = {}
+
+    def section(self, cinema: str, day: date, header: str, titles: Sequence[str]) -> List[str]:
+        key = (cinema, day.isoformat(), header)
+        version = tuple(titles)
+        cached = self._sections.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        chunks = split_message(header, [escape(t) for t in version])
+        self._sections[key] = (version, chunks)
+        return chunks
+
+    def forget_before(self, day: date) -> None:
+        cutoff = day.isoformat()
+        self._sections = {k: v for k, v in self._sections.items() if k[1] >= cutoff}
+
+    def __len__(self) -> int:
+        return len(self._sections)
+
+
+render_cache = RenderCache()
+clock.on_rollover(render_cache.forget_before)
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from datetime import date
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from bot.config import settings
+from bot.coordination import INSTANCE_ID, CoordinationBackend, get_backend
+
+Fetcher = Callable[[str, date, bool], Awaitable[List[str]]]
+Listener = Callable[[str, date, List[str]], None]
+
+logger = logging.getLogger(__name__)
+
+# Сколько помнить промах общего кэша: обработчики не ходят в БД за одним и тем же пустым ключом
+NEGATIVE_TTL_SEC = 5.0
+
+
+class ScheduleCache:
+    """Кэш расписания по (кинотеатр, дата), общий для всех реплик.
+
+    Уровни: локальный словарь процесса -> общий кэш бэкенда координации -> скрейп.
+    Промах обслуживается одним скрейпом: внутри процесса — общей задачей,
+    между репликами — арендой ``scrape:<ключ>``; остальные ждут, пока значение
+    появится в общем кэше.
+    """
+
+    def __init__(self, fetcher: Fetcher, backend: Optional[CoordinationBackend] = None,
+                 ttl: Optional[float] = None, scrape_timeout: float = 60.0, owner: str = INSTANCE_ID,
+                 negative_ttl: float = NEGATIVE_TTL_SEC):
+        self._fetcher = fetcher
+        self.owner = owner
+        self._backend = backend
+        self.ttl = ttl if ttl is not None else settings.SCHEDULE_CACHE_TTL
+        self.scrape_timeout = scrape_timeout
+        self.negative_ttl = negative_ttl
+        self._local: Dict[str, Tuple[List[str], float]] = {}
+        self._misses: Dict[str, float] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._listeners: List[Listener] = []
+
+    @property
+    def backend(self) -> CoordinationBackend:
+        return self._backend or get_backend()
+
+    def subscribe(self, listener: Listener) -> None:
+        """``listener(cinema, day, titles)`` вызывается, когда в процессе появляется новое значение"""
+        self._listeners.append(listener)
+
+    def _notify(self, cinema: str, day: date, titles: List[str]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(cinema, day, titles)
+            except Exception:
+                logger.exception(f"Ошибка подписчика кэша для {cinema} на {day}")
+
+    @staticmethod
+    def key(cinema: str, day: date) -> str:
+        return f"schedule:{cinema}:{day.isoformat()}"
+
+    def _from_local(self, key: str, now: float) -> Tuple[bool, Optional[List[str]]]:
+        """(ответ известен без БД, значение): свежая запись или недавний промах"""
+        local = self._local.get(key)
+        if local and local[1] > now:
+            return True, local[0]
+        return self._misses.get(key, 0.0) > now, None
+
+    def _remember(self, cinema: str, day: date, key: str, shared: Optional[Tuple[str, float]], now: float) -> Optional[List[str]]:
+        if shared is None:
+            self._misses[key] = now + self.negative_ttl
+            return None
+        titles = json.loads(shared[0])
+        self._local[key] = (titles, shared[1])
+        # Значение записала другая реплика (или прошлый запуск) — локальные индексы его ещё не видели
+        self._notify(cinema, day, titles)
+        return titles
+
+    async def peek(self, cinema: str, day: date, use_negative: bool = True) -> Optional[List[str]]:
+        """Значение из кэша без скрейпа; None при промахе.
+
+        Общий кэш читается в потоке, а недавний промах помнится ``negative_ttl``
+        секунд: повторные запросы по пустому ключу отвечаются из памяти.
+        """
+        key = self.key(cinema, day)
+        now = time.time()
+        known, titles = self._from_local(key, now)
+        if known and (titles is not None or use_negative):
+            return titles
+        shared = await asyncio.to_thread(self.backend.cache_get, key)
+        return self._remember(cinema, day, key, shared, time.time())
+
+    async def peek_many(self, pairs: Iterable[Tuple[str, date]]) -> Dict[Tuple[str, date], Optional[List[str]]]:
+        """Как ``peek`` для многих ключей: всё, чего нет в памяти, читается одним походом в поток"""
+        now = time.time()
+        result: Dict[Tuple[str, date], Optional[List[str]]] = {}
+        unknown: List[Tuple[str, date]] = []
+        for cinema, day in pairs:
+            known, titles = self._from_local(self.key(cinema, day), now)
+            if known:
+                result[(cinema, day)] = titles
+            else:
+                unknown.append((cinema, day))
+        if unknown:
+            keys = [self.key(cinema, day) for cinema, day in unknown]
+            shared = await asyncio.to_thread(lambda: [self.backend.cache_get(k) for k in keys])
+            now = time.time()
+            for (cinema, day), key, value in zip(unknown, keys, shared):
+                result[(cinema, day)] = self._remember(cinema, day, key, value, now)
+        return result
+
+    async def put(self, cinema: str, day: date, titles: List[str]) -> None:
+        key = self.key(cinema, day)
+        self._local[key] = (titles, time.time() + self.ttl)
+        self._misses.pop(key, None)
+        self._notify(cinema, day, titles)
+        await asyncio.to_thread(self.backend.cache_set, key, json.dumps(titles, ensure_ascii=False), self.ttl)
+
+    def forget_before(self, day: date) -> None:
+        """Убирает из локального кэша прошедшие даты (в общем кэше они истекут по TTL)"""
+        cutoff = day.isoformat()
+        self._local = {k: v for k, v in self._local.items() if k.rsplit(":", 1)[1] >= cutoff}
+        self._misses = {k: v for k, v in self._misses.items() if k.rsplit(":", 1)[1] >= cutoff}
+
+    async def get(self, cinema: str, day: date, fast: bool = True) -> List[str]:
+        cached = await self.peek(cinema, day)
+        if cached is not None:
+            return cached
+        return await self.refresh(cinema, day, fast=fast, wait_for_peer=True)
+
+    async def refresh(self, cinema: str, day: date, fast: bool = True, wait_for_peer: bool = False) -> List[str]:
+        """Скрейпит и записывает в кэш; параллельные вызовы для одного ключа делят один скрейп"""
+        key = self.key(cinema, day)
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(self._load(cinema, day, fast, wait_for_peer))
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: таймаут одного обработчика не должен отменять общий скрейп
+        return await asyncio.shield(fut)
+
+    async def _load(self, cinema: str, day: date, fast: bool, wait_for_peer: bool) -> List[str]:
+        key = self.key(cinema, day)
+        lease = f"scrape:{key}"
+        owned = await asyncio.to_thread(self.backend.acquire_lease, lease, self.owner, self.scrape_timeout)
+        if not owned and wait_for_peer:
+            # Другая реплика уже скрейпит этот ключ — ждём её результат
+            deadline = time.monotonic() + self.scrape_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.5)
+                # Мимо памяти промахов: ждём именно появления значения в общем кэше
+                cached = await self.peek(cinema, day, use_negative=False)
+                if cached is not None:
+                    return cached
+            logger.warning(f"Не дождались скрейпа {key} от другой реплики, загружаем сами")
+        try:
+            titles = await self._fetcher(cinema, day, fast)
+            await self.put(cinema, day, titles)
+            return titles
+        finally:
+            if owned:
+                await asyncio.to_thread(self.backend.release_lease, lease, self.owner)
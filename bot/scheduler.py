@@ -1,111 +1,155 @@
 from __future__ import annotations
 
-from datetime import date, datetime
-import pytz
+from datetime import date, timedelta
+from html import escape
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
 
 from aiogram import Bot
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.base import BaseTrigger
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
 from bot.config import settings
+from bot.coordination import LeaderElector, get_backend
 from bot.storage import events_db
-from bot.utils.time_utils import get_current_moscow_date
-from .filters import filter_movie_titles
-from .parsers.prada import fetch_prada_titles
-from .parsers.afisha_karo import fetch_karo_titles
-from .parsers.kino_format import fetch_kinoformat_titles
-from .storage.storage import SeenStorage
-
-async def daily_check(bot: Bot) -> None:
-    """Проверяет новые фильмы и отправляет уведомления владельцу"""
-    today = date.today()
-    storage = SeenStorage()
-
-    prada_titles = filter_movie_titles(fetch_prada_titles(today))
-    karo_titles = await fetch_karo_titles(today)
-    kino_titles = await fetch_kinoformat_titles(today)
-
-    filtered: Dict[str, List[str]] = {
-        "prada": prada_titles,
-        "karo": karo_titles,
-        "kinoformat": kino_titles,
-    }
-
-    new_titles: Dict[str, List[str]] = {}
-    for key, titles in filtered.items():
-        newly = storage.add_and_get_new(key, titles)
-        if newly:
-            new_titles[key] = newly
-
-    if new_titles and settings.OWNER_CHAT_ID:
-        lines: List[str] = ["Обнаружены новые фильмы:"]
-        for key, titles in new_titles.items():
-            lines.append(f"\n<b>{key}</b>:\n" + "\n".join(titles))
-        await bot.send_message(chat_id=settings.OWNER_CHAT_ID, text="\n".join(lines))
-
-async def morning_digest(bot: Bot) -> None:
-    """Отправляет дайджест киноафиш владельцу"""
-    today = date.today()
-    prada = filter_movie_titles(fetch_prada_titles(today))
-    karo = await fetch_karo_titles(today)
-    kino = await fetch_kinoformat_titles(today)
-
-    if settings.OWNER_CHAT_ID:
-        await bot.send_message(settings.OWNER_CHAT_ID, "<b>Prada 3D</b>\n" + ("\n".join(prada) or "— нет данных"))
-        await bot.send_message(settings.OWNER_CHAT_ID, "<b>Karo 10 Реутов</b>\n" + ("\n".join(karo) or "— нет данных"))
-        await bot.send_message(settings.OWNER_CHAT_ID, "<b>Киноцентр (Kino-Format)</b>\n" + ("\n".join(kino) or "— нет данных"))
-
-async def send_event_reminders(bot: Bot) -> None:
-    """Отправляет напоминания о событиях в группы"""
+from bot.utils.clock import clock
+from bot.utils.time_utils import get_current_moscow_date, get_current_moscow_time
+from .render import pack_messages, render_cache
+from .sources import fetch_window, get_titles_for
+from .storage.jobstore import SQLiteJobStore
+from .storage.snapshots import SnapshotStore
+from .subscriptions import notify_subscribers
+
+# Задачи лежат в постоянном хранилище только ссылкой на run_job и своим id,
+# а бот живёт здесь и задаётся в setup_scheduler
+_bot: Optional[Bot] = None
+
+
+def _run_key(trigger: BaseTrigger) -> str:
+    """Период запуска: дата для ежедневных задач, минута — для интервальных"""
+    now = get_current_moscow_time()
+    if isinstance(trigger, CronTrigger):
+        return now.strftime("%Y-%m-%d")
+    return now.strftime("%Y-%m-%dT%H:%M")
+
+
+async def run_job(job_id: str) -> None:
+    """Точка входа всех задач: не более одного раза за период.
+
+    Запускает задачи только планировщик лидера (см. setup_scheduler). Последний
+    успешный период хранится в БД событий, поэтому догоняющий запуск после рестарта
+    не повторит уже сделанную работу, а заявка в бэкенде координации не даёт двум
+    репликам выполнить задачу одновременно, пока старый лидер ещё не понял, что
+    аренда истекла.
+    """
+    func, trigger = JOBS[job_id]
+    if _bot is None:
+        return
+    run_key = _run_key(trigger)
+    if events_db.get_last_job_run(job_id) == run_key:
+        logging.info(f"Задача {job_id} за период {run_key} уже выполнена, пропускаем")
+        return
+    if not get_backend().claim_once(f"job:{job_id}:{run_key}", ttl=24 * 3600):
+        logging.info(f"Задача {job_id} за период {run_key} выполняется другой репликой")
+        return
+    await func(_bot)
+    events_db.set_last_job_run(job_id, run_key)
+
+
+async def prefetch_schedules(bot: Bot) -> None:
+    """Заполняет общий кэш расписанием на всё окно, чтобы обработчики не ждали скрейпа"""
     today = get_current_moscow_date()
+    await fetch_window([today + timedelta(days=i) for i in range(settings.PREFETCH_DAYS)], fast=True)
 
-    # Получаем все события из базы данных
-    events = events_db.get_all_events()
-
-    for event in events:
-        event_id, name, event_date_str, group_chat_id = event
-        event_date = datetime.strptime(event_date_str, "%Y-%m-%d").date()
 
-        # Рассчитываем разницу в днях
-        days_remaining = (event_date - today).days
-
-        # Пропускаем прошедшие события
-        if days_remaining < 0:
-            continue
-
-        # Формируем сообщение
-        if days_remaining == 0:
-            message = f"🎉 СЕГОДНЯ {name}!"
-        elif days_remaining == 1:
-            message = f"⏳ До {name} остался 1 день!"
-        else:
-            message = f"⏳ До {name} осталось {days_remaining} дней!"
+async def daily_check(bot: Bot) -> None:
+    """Сравнивает расписание на всё окно с прошлым снимком и уведомляет владельца и подписчиков о новых фильмах"""
+    today = get_current_moscow_date()
+    window = [today + timedelta(days=i) for i in range(settings.PREFETCH_DAYS)]
 
-        # Отправляем в группу
-        if group_chat_id > 0:
-            await bot.send_message(chat_id=group_chat_id, text=message)
-        else:
-            # Используем дефолтную группу
-            default_group = events_db.get_default_group()
-            if default_group > 0:
-                await bot.send_message(chat_id=default_group, text=message)
+    snapshot = await fetch_window(window)
+    diffs = SnapshotStore().update(today, snapshot)
 
-def setup_scheduler(bot: Bot) -> AsyncIOScheduler:
-    """Настройка планировщика задач"""
-    tz = pytz.timezone(settings.TZ)
-    scheduler = AsyncIOScheduler(timezone=tz)
+    lines: List[str] = []
+    for key, diff in diffs.items():
+        if diff.added_titles:
+            lines.append(f"\n<b>{key}</b>:")
+            for title in diff.added_titles:
+                dates = ", ".join(date.fromisoformat(iso).strftime("%d.%m") for iso in diff.dates_for(title))
+                lines.append(f"{escape(title)} ({dates})")
+        if diff.removed_titles:
+            lines.append(f"\n<b>{key}</b>, сняты с показа:\n" + "\n".join(escape(t) for t in diff.removed_titles))
 
-    # Запускать проверку новых фильмов каждый день в 8:00 по Москве
-    scheduler.add_job(daily_check, 'cron', hour=8, minute=0, args=[bot])
+    if lines and settings.OWNER_CHAT_ID:
+        await bot.send_message(chat_id=settings.OWNER_CHAT_ID, text="\n".join(["Изменения в афише:"] + lines))
 
-    # Запускать дайджест киноафиш по будням в 8:00 и по выходным в 12:00
-    scheduler.add_job(morning_digest, 'cron', day_of_week="mon-fri", hour=8, minute=0, args=[bot])
-    scheduler.add_job(morning_digest, 'cron', day_of_week="sat,sun", hour=12, minute=0, args=[bot])
-    scheduler.add_job(send_newyear_sticker_daily, 'cron', hour=9, minute=0, args=[bot])
+    sent = await notify_subscribers(bot, diffs)
+    if sent:
+        logging.info(f"Отправлено уведомлений подписчикам: {sent}")
 
+async def morning_digest(bot: Bot) -> None:
+    """Отправляет дайджест киноафиш владельцу"""
+    # Берём из кэша, который держит свежим prefetch_schedules: догоняющий запуск почти бесплатен
+    today = get_current_moscow_date()
+    prada, karo, kino = await asyncio.gather(
+        get_titles_for("prada", today),
+        get_titles_for("karo", today),
+        get_titles_for("kinoformat", today),
+    )
 
-    # Запускать напоминания о событиях каждый день в 9:00 по Москве
-    scheduler.add_job(send_event_reminders, 'cron', hour=9, minute=0, args=[bot])
+    if settings.OWNER_CHAT_ID:
+        sections = (
+            render_cache.section("prada", today, "<b>Prada 3D</b>", prada),
+            render_cache.section("karo", today, "<b>Karo 10 Реутов</b>", karo),
+            render_cache.section("kinoformat", today, "<b>Киноцентр (Kino-Format)</b>", kino),
+        )
+        for text in pack_messages(chunk for chunks in sections for chunk in chunks):
+            await bot.send_message(settings.OWNER_CHAT_ID, text)
+
+def setup_scheduler(bot: Bot, elector: Optional[LeaderElector] = None) -> AsyncIOScheduler:
+    """Настройка и запуск планировщика задач.
+
+    Задачи хранятся в БД событий, поэтому пропущенный за время простоя запуск
+    выполняется один раз после старта (если опоздание меньше MISFIRE_GRACE_MIN).
+    С ``elector`` планировщик стоит на паузе, пока реплика не станет лидером, и снова
+    встаёт на паузу при потере лидерства: общую таблицу задач разбирает только лидер,
+    и ни один запуск не забирает реплика, которой его нельзя выполнить.
+    """
+    global _bot
+    _bot = bot
+
+    scheduler = AsyncIOScheduler(
+        timezone=clock.tz,
+        jobstores={"default": SQLiteJobStore()},
+        job_defaults={
+            "coalesce": True,
+            "max_instances": 1,
+            "misfire_grace_time": settings.MISFIRE_GRACE_MIN * 60,
+        },
+    )
+
+    # Стартуем на паузе: сверяем сохранённые задачи с JOBS, не теряя пропущенных запусков
+    scheduler.start(paused=True)
+    for job_id, (_, trigger) in JOBS.items():
+        existing = scheduler.get_job(job_id)
+        if existing is None or str(existing.trigger) != str(trigger):
+            scheduler.add_job(run_job, trigger, id=job_id, args=[job_id], replace_existing=True)
+    for job in scheduler.get_jobs():
+        if job.id not in JOBS:
+            job.remove()
+    if elector is None:
+        scheduler.resume()
+    else:
+        elector.on_change(lambda leader: scheduler.resume() if leader else scheduler.pause())
+        if elector.is_leader:
+            scheduler.resume()
+
+    # В полночь окно сдвигается на день: новый последний день загружаем сразу,
+    # не дожидаясь очередного интервала предзагрузки
+    clock.on_rollover(lambda day: scheduler.get_job("prefetch_schedules").modify(next_run_time=clock.now()))
 
     return scheduler
 
@@ -125,4 +169,19 @@ async def send_newyear_sticker_daily(bot: Bot) -> None:
     sticker_id = settings.STICKER_IDS.get(days_remaining)
 
     if sticker_id and settings.OWNER_CHAT_ID:
-        await bot.send_sticker(chat_id=settings.OWNER_CHAT_ID, sticker=sticker_id)
\ No newline at end of file
+        await bot.send_sticker(chat_id=settings.OWNER_CHAT_ID, sticker=sticker_id)
+
+
+_TZ = clock.tz
+
+# id задачи -> (функция, расписание по Москве)
+JOBS: Dict[str, Tuple[Callable[[Bot], Awaitable[None]], BaseTrigger]] = {
+    # Проверка новых фильмов каждый день в 8:00
+    "daily_check": (daily_check, CronTrigger(hour=8, minute=0, timezone=_TZ)),
+    # Дайджест киноафиш по будням в 8:00 и по выходным в 12:00
+    "morning_digest_weekdays": (morning_digest, CronTrigger(day_of_week="mon-fri", hour=8, minute=0, timezone=_TZ)),
+    "morning_digest_weekend": (morning_digest, CronTrigger(day_of_week="sat,sun", hour=12, minute=0, timezone=_TZ)),
+    "newyear_sticker": (send_newyear_sticker_daily, CronTrigger(hour=9, minute=0, timezone=_TZ)),
+    # Фоновая предзагрузка окна расписания в общий кэш
+    "prefetch_schedules": (prefetch_schedules, IntervalTrigger(minutes=settings.PREFETCH_INTERVAL_MIN, timezone=_TZ)),
+}
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import bisect
+from collections import Counter
+from typing import Dict, List, Set
+
+from .titles import FilmCluster, TitleIndex, canonical_key, trigrams
+
+# Сколько опечаток прощается слову запроса в зависимости от его длины
+MAX_TYPOS_SHORT = 1
+MAX_TYPOS_LONG = 2
+LONG_WORD = 7
+# Короче этого слово запроса ищется только по префиксу, без опечаток
+MIN_FUZZY_LEN = 4
+
+
+def _within_distance(a: str, b: str, limit: int) -> bool:
+    """Расстояние Левенштейна между ``a`` и ``b`` не больше ``limit`` (с отсечением по полосе)"""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+        if min(cur) > limit:
+            return False
+        prev = cur
+    return prev[-1] <= limit
+
+
+class SearchIndex:
+    """Инвертированный индекс слов названий -> фильмы из ``TitleIndex``.
+
+    Пополняется по мере появления новых названий в индексе фильмов (а тот — из кэша
+    расписаний), поэтому поиск никогда не ходит на сайты. Слово запроса совпадает
+    со словом названия по префиксу, а если таких нет — с опечатками: кандидаты
+    берутся из индекса триграмм словаря и проверяются расстоянием Левенштейна.
+    """
+
+    def __init__(self, titles: TitleIndex):
+        self.titles = titles
+        self._words: Dict[str, Set[int]] = {}
+        self._sorted: List[str] = []
+        self._dirty = False
+        self._grams: Dict[str, Set[str]] = {}
+        titles.subscribe(self.add)
+
+    def add(self, cid: int, key: str) -> None:
+        for word in key.split():
+            films = self._words.get(word)
+            if films is None:
+                films = self._words[word] = set()
+                self._dirty = True
+                for g in trigrams(word):
+                    self._grams.setdefault(g, set()).add(word)
+            films.add(cid)
+
+    def _vocabulary(self) -> List[str]:
+        # Отсортированный словарь для поиска по префиксу; пересобирается только после добавлений
+        if self._dirty:
+            self._sorted = sorted(self._words)
+            self._dirty = False
+        return self._sorted
+
+    def _prefix_words(self, prefix: str) -> List[str]:
+        vocab = self._vocabulary()
+        i = bisect.bisect_left(vocab, prefix)
+        words = []
+        while i < len(vocab) and vocab[i].startswith(prefix):
+            words.append(vocab[i])
+            i += 1
+        return words
+
+    def _fuzzy_words(self, word: str) -> List[str]:
+        if len(word) < MIN_FUZZY_LEN:
+            return []
+        limit = MAX_TYPOS_LONG if len(word) >= LONG_WORD else MAX_TYPOS_SHORT
+        candidates: Counter = Counter()
+        for g in trigrams(word):
+            candidates.update(self._grams.get(g, ()))
+        # Слово словаря обрезается до длины запроса (с запасом на опечатки): так
+        # недописанное слово с опечаткой тоже находит своё
+        return [w for w, _ in candidates.most_common(50) if _within_distance(word, w[:len(word) + limit], limit)]
+
+    def _films_for(self, word: str) -> Dict[int, int]:
+        """id фильма -> вес совпадения: 2 — префикс, 1 — с опечаткой"""
+        scores: Dict[int, int] = {}
+        for w in self._prefix_words(word):
+            for cid in self._words[w]:
+                scores[cid] = 2
+        if not scores:
+            for w in self._fuzzy_words(word):
+                for cid in self._words[w]:
+                    scores.setdefault(cid, 1)
+        return scores
+
+    def search(self, query: str, limit: int = 10) -> List[FilmCluster]:
+        """Фильмы, в названии которых есть все слова запроса; только те, что сейчас в расписании"""
+        words = canonical_key(query).split()
+        if not words:
+            return []
+        total: Dict[int, int] = {}
+        for i, word in enumerate(words):
+            found = self._films_for(word)
+            if i == 0:
+                total = found
+            else:
+                total = {cid: score + found[cid] for cid, score in total.items() if cid in found}
+            if not total:
+                return []
+        clusters = self.titles.clusters
+        ranked = sorted(
+            (cid for cid in total if clusters[cid].places),
+            key=lambda cid: (-total[cid], len(clusters[cid].key)),
+        )
+        return [clusters[cid] for cid in ranked[:limit]]
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import date
+from typing import Dict, Iterable, List, Literal
+
+from bot.config import settings
+from .filters import filter_movie_titles
+from .schedule_cache import ScheduleCache
+from .search import SearchIndex
+from .titles import TitleIndex
+from .utils.clock import clock
+
+CinemaKey = Literal["prada", "karo", "kinoformat"]
+CINEMAS: tuple[CinemaKey, ...] = ("prada", "karo", "kinoformat")
+
+logger = logging.getLogger(__name__)
+
+
+async def fetch_titles(cinema: CinemaKey, day: date, fast: bool = False) -> list[str]:
+    """Скрейпит сайт кинотеатра напрямую, минуя кэш"""
+    # Парсеры тянут requests/bs4/lxml, поэтому импортируются при первом запросе, а не при старте
+    if cinema == "prada":
+        from .parsers.prada import fetch_prada_titles_async
+        return filter_movie_titles(await fetch_prada_titles_async(day))
+    if cinema == "karo":
+        from .parsers.afisha_karo import fetch_karo_titles, fetch_karo_titles_quick
+        if fast:
+            return await fetch_karo_titles_quick(day)
+        return await fetch_karo_titles(day)
+    if cinema == "kinoformat":
+        from .parsers.kino_format import fetch_kinoformat_titles
+        return await fetch_kinoformat_titles(day)
+    return []
+
+
+schedule_cache = ScheduleCache(fetch_titles)
+
+# Фильмы всех кинотеатров под каноническими названиями; пополняется из кэша расписаний
+title_index = TitleIndex()
+schedule_cache.subscribe(lambda cinema, day, titles: title_index.update(cinema, day.isoformat(), titles))
+# Поиск по словам названий (/find) пополняется вместе с индексом фильмов
+search_index = SearchIndex(title_index)
+
+
+def _forget_past(today: date) -> None:
+    schedule_cache.forget_before(today)
+    title_index.forget_before(today.isoformat())
+
+
+clock.on_rollover(_forget_past)
+
+
+async def index_cached(days: Iterable[date], cinemas: Iterable[CinemaKey] = CINEMAS) -> None:
+    """Дотягивает в индекс названий то, что уже лежит в кэше (без скрейпа)"""
+    days = list(days)
+    missing = [(c, d) for c in cinemas for d in days if not title_index.has_entry(c, d.isoformat())]
+    if missing:
+        # Найденное попадает в индекс через подписчика кэша
+        await schedule_cache.peek_many(missing)
+
+
+async def get_titles_for(cinema: CinemaKey, day: date, fast: bool = False) -> list[str]:
+    """Расписание из общего кэша; при промахе — один скрейп на всех"""
+    return await schedule_cache.get(cinema, day, fast=fast)
+
+
+async def fetch_window(
+    days: Iterable[date],
+    cinemas: Iterable[CinemaKey] = CINEMAS,
+    fast: bool = False,
+    concurrency: int | None = None,
+) -> Dict[CinemaKey, Dict[date, List[str]]]:
+    """Скрейпит все кинотеатры на несколько дней и обновляет кэш.
+
+    Неудачные загрузки в результат не попадают: для диффа «не удалось скачать»
+    и «фильмов нет» — разные вещи.
+    """
+    concurrency = concurrency or settings.FETCH_CONCURRENCY
+    sem = asyncio.Semaphore(concurrency)
+    days = list(days)
+    result: Dict[CinemaKey, Dict[date, List[str]]] = {c: {} for c in cinemas}
+
+    async def one(cinema: CinemaKey, day: date) -> None:
+        async with sem:
+            try:
+                result[cinema][day] = await schedule_cache.refresh(cinema, day, fast=fast)
+            except Exception as e:
+                logger.warning(f"Не удалось получить расписание {cinema} на {day}: {e}")
+
+    async def prada_batch() -> None:
+        # Prada отдаёт список доступных дат, поэтому всё окно берётся одним пакетом
+        from .parsers.prada import fetch_prada_titles_batch
+        try:
+            batch = await fetch_prada_titles_batch(days, concurrency=concurrency)
+        except Exception as e:
+            logger.warning(f"Не удалось получить расписание prada на {len(days)} дн.: {e}")
+            return
+        for day, titles in batch.items():
+            titles = filter_movie_titles(titles)
+            await schedule_cache.put("prada", day, titles)
+            result["prada"][day] = titles
+
+    jobs = [one(c, d) for c in result if c != "prada" for d in days]
+    if "prada" in result:
+        jobs.append(prada_batch())
+    await asyncio.gather(*jobs)
+    return result
@@ -0,0 +1,106 @@
+"""file_id стикеров обратного отсчёта до Нового года: дней осталось -> стикер"""
+
+STICKER_IDS = {
+    100: "CAACAgIAAxkBAAIBaWkKYKOY9U_qAAFAjDuWQvMQuscEEgACdlYAAg5ZmUshcFKzlRBkqjYE",
+    99: "CAACAgIAAxkBAAIBcGkKYSH9FYPqq5cI8bEHxXQ9DrLqAAK_YAACspOYSyU6pfaEjWtVNgQ",
+    98: "CAACAgIAAxkBAAIBcmkKYSmEC7NYO9RERLOj0aA8aWrfAALHZAACuHOYS34_DzgCPeaJNgQ",
+    97: "CAACAgIAAxkBAAIBdGkKYTGg8dWxMiYqkSu6mXzNXjgwAAJdigACIruZS_vwWnOx2QNbNgQ",
+    96: "CAACAgIAAxkBAAIBdmkKYTlLmdi5L6oZlzEibYWGQkzuAAIrXQACeGCZS7LPiQpdJOcxNgQ",
+    95: "CAACAgIAAxkBAAIBeGkKYT8zGxO8SSwwFbrMynq9FJ_HAAJXTgAC4z-hS6ghOVS-HT1zNgQ",
+    94: "CAACAgIAAxkBAAIBemkKYUZJs-oacSVKNdjdMtT4_Ry8AAJOTwAC32yhS5Ogo5dnESW4NgQ",
+    93: "CAACAgIAAxkBAAIBfGkKYUxPbGbAfN97asSBpcncyM_hAAIHWgACgzuZSzChhG352PDyNgQ",
+    92: "CAACAgIAAxkBAAIBfmkKYVJZpELmCsnsm3pLSqRbGZzLAAIqYAACpBOZS-7Rh3vGJKIsNgQ",
+    91: "CAACAgIAAxkBAAIBgGkKYVhr7X2xFZTqfUoUni51WklPAAJXUQACTZehS0yXsSKFQ93ZNgQ",
+    90: "CAACAgIAAxkBAAIBgmkKYWG4Z3b-JtugunVOtoEngu_1AAI5TgACyXGgS3vjTJKsGGciNgQ",
+    89: "CAACAgIAAxkBAAIBhGkKYWc5whDPoAABIdzuSOE5qgn6AQACtlYAAvyKmEvJhqrcD3PUjjYE",
+    88: "CAACAgIAAxkBAAIBhmkKYW0BpsXrpiA7bNftdKGeA1WvAAKgUAACDHCgS0Gln3GBLYxVNgQ",
+    87: "CAACAgIAAxkBAAIBiGkKYXSqmek4Cj4cCRSsZC32vDq_AAJjUwACpjqgS3HUMebKLsK5NgQ",
+    86: "CAACAgIAAxkBAAIBimkKYXtfG4_vxXVvLWa1NFnprKteAAKwUAACZIKhS4KQBG4rgnBiNgQ",
+    85: "CAACAgIAAxkBAAIBjGkKYYJTzDjeMw8CkFsj4lVB1bTXAAIjWQACMLmYSzLWrHOY1eeYNgQ",
+    84: "CAACAgIAAxkBAAIBjmkKYYhENuqAqzOJNqPWVEZFcMXhAAJVWwACfzOYS9emncESF0qkNgQ",
+    83: "CAACAgIAAxkBAAIBkGkKYY6jTXuJ4PU_55LZQ_99kqspAAIPUAACMB-hS9APJzN7HRPRNgQ",
+    82: "CAACAgIAAxkBAAIBkmkKYZTsVnMsrCyC01pspq8iEN7bAAKnUQAC3eOgS_5toYx48g2HNgQ",
+    81: "CAACAgIAAxkBAAIBlGkKYZ75FNEfJ5lK9D6UUd44ISpeAAKmTgACMdChS_vsKZwAAb7pqjYE",
+    80: "CAACAgIAAxkBAAIBlmkKYaVC6Ln8Cw0gdwHFumSi3EHRAAKyZQACyhGYS_mH0oc_jU_CNgQ",
+    79: "CAACAgIAAxkBAAIBmGkKYatkyKrLYmTKyew68iBwwzH7AALiVAACdaOZSyEegUmrvbG2NgQ",
+    78: "CAACAgIAAxkBAAIBmmkKYbI2mQja_mbur_B-fIpJPdWZAAK3YQACsuWZS9MuFsRqObhhNgQ",
+    77: "CAACAgIAAxkBAAIBnGkKYby7Jn-Sx5soF9_wNtdHpM_ZAAKeYQACO92YS4F7BSmKguNyNgQ",
+    76: "CAACAgIAAxkBAAIBnmkKYhYWhc4mNoeirMqOJ_V73tXWAAKkVwACl92YS4OW3AHwD0qQNgQ",
+    75: "CAACAgIAAxkBAAIBoGkKYiFjXOOYpuYMlz3VWWh3DUg_AALaUgAC-QSgS4eIg-2irC92NgQ",
+    74: "CAACAgIAAxkBAAIBomkKYiwoluZM-WwSSjnXJpLoV74WAAJpYAACX2WYS-hXRNK-nu6DNgQ",
+    73: "CAACAgIAAxkBAAIBpGkKYjEq_a8cBU65ijZmiR0ceEjOAAJPUQAC9VShS1iXb1mm-T-sNgQ",
+    72: "CAACAgIAAxkBAAIBpmkKYjiYrb0GFO8cmRqOWc2_A_yeAAIfZgACu_GYS-gMcb2EyIT5NgQ",
+    71: "CAACAgIAAxkBAAIBqGkKYkFKBkdxk-oLS4iOCq7hG6SDAAIPZAAC68CYS2wMjx-uGo0AATYE",
+    70: "CAACAgIAAxkBAAIBqmkKYka8j0ETeEqmfuSaQU-lq1gbAAJ9YAACgQqYSwqX-Uj3GyigNgQ",
+    69: "CAACAgIAAxkBAAIBrGkKYk6Hbua09lLkuRzJFrJvWJYWAAKcXAACdNqYS05dGJ-ic3F8NgQ",
+    68: "CAACAgIAAxkBAAIBrmkKYlRLbwABT6_yIpvd_WnQqG0f9gACTFEAAnCzoUs51zDZ9fQvWzYE",
+    67: "CAACAgIAAxkBAAIBsGkKYl2neI7bLEPMT-WIHV0m495NAALKTQACOKSgS0v6uQrecImWNgQ",
+    66: "CAACAgIAAxkBAAIBsmkKYmfqLL5CZEkhA2mLyiPLl_WLAAL3VQACRrygS4ibhwsPpnmfNgQ",
+    65: "CAACAgIAAxkBAAIBtGkKYmzfYTzgbICgiVrVWXHOm2SKAAKqXwACn7SZS4bCDeFAee5HNgQ",
+    64: "CAACAgIAAxkBAAIBtmkKYneppTIijdNWT0_3E49owhxrAALJUQAC_t2hS74I8wz_W3k7NgQ",
+    63: "CAACAgIAAxkBAAIBuGkKYnysISA6l7rV59N8SD5s6iUwAAIoUgACJb2hS3SdqhaJIo7MNgQ",
+    62: "CAACAgIAAxkBAAIBumkKYoOpxg4fpNdeQQ0uhIawaF10AALtXgACeBuZS91vcu5mSn4_NgQ",
+    61: "CAACAgIAAxkBAAIBvGkKYoeTktwO0zBFhT4f8lfpifcYAALaVgACMVaZS2e0bSYSK288NgQ",
+    60: "CAACAgIAAxkBAAIBvmkKYpCL8brPA_HTq1SE4Bp9xGW5AALHXgAC526ZS5CP2nvJpnWtNgQ",
+    59: "CAACAgIAAxkBAAIBwGkKYpV0n7jkQDtZFQeyWBQaJK53AAKGUgAC2RigSwkt_naOcaDyNgQ",
+    58: "CAACAgIAAxkBAAIBwmkKYppBEynsZX2xUCpSY35ic_L7AAKwWAACSYKZS_Rz2XcbXiQZNgQ",
+    57: "CAACAgIAAxkBAAIBxGkKYp-f4OAISOK_mvkDUQ207YgZAAL5UQACWNygSw3EsXMzP-19NgQ",
+    56: "CAACAgIAAxkBAAIBxmkKYqSherGb1IZ5gkW-0J8cDNwhAAJ0UAACqQABoEuNK6x5CnHZejYE",
+    55: "CAACAgIAAxkBAAIByGkKYqmh8avaYcFiVHwAAc0q_1gq0AACjFYAAtISmEvkU0DIvG6vZDYE",
+    54: "CAACAgIAAxkBAAIBymkKYq54eF5U8knNcLOdvr34zVjEAAKaTQACsQaZS9kM-TnblesnNgQ",
+    53: "CAACAgIAAxkBAAIBzGkKYrP43jrQfnN2WlJ8f5ONL8AnAALUTwACFT-hS7IRwq6OFMrFNgQ",
+    52: "CAACAgIAAxkBAAIBzmkKYrltjEzVyxziEBax8y97WNP2AAJeTgAC4kihS3meTpBU8Om9NgQ",
+    51: "CAACAgIAAxkBAAIB0GkKYr4WIJ0E0vIdSMEDVxr8flkzAAI9YwAC2DuZS8IXNl-3oZupNgQ",
+    50: "CAACAgIAAxkBAAIB0mkKYsSp0xC4A5gIcHu8g9oznMz3AAJgYgACCVaYS9z60MUdjIyRNgQ",
+    49: "CAACAgIAAxkBAAIB1GkKYssTmIubYtVjEXgOCqXSjviWAALWXAAC_tGYS4XMkAqS8jgbNgQ",
+    48: "CAACAgIAAxkBAAIB1mkKYtG5IqiGZJwmHs9wJ_lumgM4AAKoYwACj7SYS-mYkdq2XpuTNgQ",
+    47: "CAACAgIAAxkBAAIB2GkKYtYVHTmmFo2_BPinc1zDOoSSAAIuUAACi4GhS1azQlatE3yxNgQ",
+    46: "CAACAgIAAxkBAAIB2mkKYtuRjDUhaAthq1TIlQhcujVaAAKvYgACi8yZS9weUWNBfsz7NgQ",
+    45: "CAACAgIAAxkBAAIB3GkKYuAtU8FzbgjPJqxW9qFrzesZAAK-YAACD5OYSzAKebNnggOUNgQ",
+    44: "CAACAgIAAxkBAAIB3mkKYua330wMBnquIvgmX_T4CcsJAAKUXwACEoKZS_NiYTdqjpnqNgQ",
+    43: "CAACAgIAAxkBAAIB4GkKYuoUQzgVfDzVF3FUSQGZOYPdAALRUgAChWSgS0cKIrdzwqqzNgQ",
+    42: "CAACAgIAAxkBAAIB4mkKYu__Nh_rvaVjJZYX3kOPGOucAAJrTQAC2nSgS7sFLYfjERubNgQ",
+    41: "CAACAgIAAxkBAAIB5GkKYvPihTC1zlTaV4WeUkRQwJmGAAKkXgACv0OZS9JIhqFgdFDiNgQ",
+    40: "CAACAgIAAxkBAAIB5mkKYvnBqlqYXfCPImUyeBX6AmTcAAL9XQACiP6ZS19y9ZG5b3mBNgQ",
+    39: "CAACAgIAAxkBAAIB6GkKYv8eA-upqeZEjo_sMPC2rr1QAAKsUQACioChS1IhMAtBE92FNgQ",
+    38: "CAACAgIAAxkBAAIB6mkKYwTX8pwVyfIGy6DOPb2rE7bbAAK1VAAC-zuYS8UmSwZ3e9OSNgQ",
+    37: "CAACAgIAAxkBAAIB7GkKYwhJlCXzuT74cXBdKOm54YImAAL3VAACPyGgS8tNCN5AfYCHNgQ",
+    36: "CAACAgIAAxkBAAIB7mkKYw0pTL-AhdNZGGxQYVxw0_hoAAJeTgACyMehSxO-OKFKZd5YNgQ",
+    35: "CAACAgIAAxkBAAIB8GkKYxLyxWx1yXCCVX1fbQjb-sTCAALaYAACJgKYS6N0lKgxGO5VNgQ",
+    34: "CAACAgIAAxkBAAIB8mkKYxYljJytGs8sXNWG9XlLF9-qAAJ4YwAC4B2YS8kAAezS6G4-PzYE",
+    33: "CAACAgIAAxkBAAIB9GkKYxo-elAAAZMMTUV10eaosawhbQAC8lwAAsC-mEsPC2onZyAhDTYE",
+    32: "CAACAgIAAxkBAAIB9mkKYyqn6vYlX0LXOLTmIpHAzLlnAAKqXgACCeyZS6GgcQABTalQ-TYE",
+    31: "CAACAgIAAxkBAAIB-GkKYy9Em1k23bGe2tnsPUoaIzHYAAJETQACkSagS4g_goXirSIvNgQ",
+    30: "CAACAgIAAxkBAAIB-mkKYzQhcD36WfPzoZ6hAAH4LfxiqAACHE4AAhqAoEtpP3g_miDlVjYE",
+    29: "CAACAgIAAxkBAAIB_GkKYzmt8lPiSZ3g7uLRLG0EitSCAAKpVAACEmuhSwaYXheakeoQNgQ",
+    28: "CAACAgIAAxkBAAIB_mkKYz4XOnguMc6nq_GN9AShCY0HAAJ1ZQACaYKZS6gvfnSxLNNeNgQ",
+    27: "CAACAgIAAxkBAAICAAFpCmND_gAB43kDNsk95qQ5Kd213YUAAlxTAAJt16FLKskr-c0wJHY2BA",
+    26: "CAACAgIAAxkBAAICBGkKY0rSWcS7DSc27x4wsS2x9b0qAAJOVQACxjShSxvfMYjd5WpcNgQ",
+    25: "CAACAgIAAxkBAAICBmkKY1GVWhin3CIxWJX6Yx_GxNQ1AALRUQACDFGhSzoL7XuxbI4CNgQ",
+    24: "CAACAgIAAxkBAAICCGkKY1ZQ0DTkjOEILh2V8RVjK_AhAAKlVQACcgyZS7IswHOBvE7FNgQ",
+    23: "CAACAgIAAxkBAAICCmkKY1sI7W-Jvo8RLLyz1QABe4oSAwACBVwAAoNTmUtlcHHDFhQRoDYE",
+    22: "CAACAgIAAxkBAAICDGkKY1_nPyqUp2DWPE4DNXgt2oSCAAL4UAACOVqhS6gfVq8qTAoLNgQ",
+    21: "CAACAgIAAxkBAAICDmkKY2NBDCpN1_0PsyamRyI674ruAAJVYAACJI2ZS8dPpLUHTYQlNgQ",
+    20: "CAACAgIAAxkBAAICEGkKY2nElFQ3ZDt4ZOmTxq9Kzzi9AALGUAAChy2hS-6006o7mXpyNgQ",
+    19: "CAACAgIAAxkBAAICEmkKY2587Jlv-hWda0JQbG1QfEn2AAJ5YwACUdGYS9Kfl_I3dSVPNgQ",
+    18: "CAACAgIAAxkBAAICFGkKY3MN0tAKXx1nwhLDEefYn1RiAALUVQACu_2gSwm1VF2KkUutNgQ",
+    17: "CAACAgIAAxkBAAICFmkKY3jGlPNqQge14JrUGZNLjtA2AAKBXwACYveYS8DkGc-H3HNONgQ",
+    16: "CAACAgIAAxkBAAICGGkKY34vHX_O5eAG7iO2Og8kEj9yAAIcTwACe5ahS-drp4zjjp5oNgQ",
+    15: "CAACAgIAAxkBAAICGmkKY4XjErEzkbUTo9K3aReJNVZaAAI_TAACBAmgSytvMLKMMthANgQ",
+    14: "CAACAgIAAxkBAAICHGkKY41g2Ptk174fN6jwQa8SZXrFAAIRWwACkTuZS1By-aCNYYBXNgQ",
+    13: "CAACAgIAAxkBAAICHmkKY5HHEizWiv9MdzpVqw6KUvgTAAI9TgACDHKhS3dolWzXL-iFNgQ",
+    12: "CAACAgIAAxkBAAICIGkKY5eSuzawVHmF9SOq7Zc59bEgAAJiXgACQlSYS55MYlqaIEnnNgQ",
+    11: "CAACAgIAAxkBAAICImkKY5z2Vx0GX2hJm5SBWaeMmvyEAANgAALGLJhL0RdUnztWg6Q2BA",
+    10: "CAACAgIAAxkBAAICJGkKY6MkejX_G9NpGarR-cGH53X1AAIWSAACf3ShS49JRiAarxGsNgQ",
+    9: "CAACAgIAAxkBAAICJmkKY6lxJ4beyJQzqnhYDixpzfyVAALXaAAClaCYS7qOUfgowjXlNgQ",
+    8: "CAACAgIAAxkBAAIBZ2kKXxE0akp_NvJ3QoGPaM7l0xeCAAIhVgAC2XGYSw28LWuyLnKKNgQ",
+    7: "CAACAgIAAxkBAAICKmkKY7PbUzVdzMNINX2OFu9C5rs6AALjWwACvxyZS1mVHsvbqN38NgQ",
+    6: "CAACAgIAAxkBAAICLGkKY7d_n1jLyk1GSL0u8uk79GlOAAIPTgACvnGgSywEIfDYHnlmNgQ",
+    5: "CAACAgIAAxkBAAICLmkKY7t3lBgAAQH9pOyMlK-N543M-AACkVgAAhczmUuso0ddB-fytjYE",
+    4: "CAACAgIAAxkBAAICMGkKY8C_vxfJpbJNdPqeTA--h6hoAAL-UgAC6DuhS_5jFyvuHwUINgQ",
+    3: "CAACAgIAAxkBAAICMmkKY8T_twWHoD8QubbOBSOVR--TAALuWAACDlOZS36_qJSQoO1ANgQ",
+    2: "CAACAgIAAxkBAAICMmkKY8T_twWHoD8QubbOBSOVR--TAALuWAACDlOZS36_qJSQoO1ANgQ",
+    1: "CAACAgIAAxkBAAICNmkKY8wTuWUFC4EtBZyw09p_C7OaAAK1WgAC50GYS2CYBRs4K7ojNgQ",
+    0: "CAACAgIAAxkBAAICOGkKY9eZlFyNChoSUI4YO5-SA_uaAALUUwACdrGgS0ICVQNtDAo3NgQ",
+    -1: "CAACAgIAAxkBAAICOmkKY9x8sZt4U1u3TZq2wCNvxNctAAJuWwAC3l6ZS5djMU8pSbJ8NgQ"
+}
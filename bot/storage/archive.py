@@ -0,0 +1,258 @@
+"""Архив скачанных страниц кинотеатров.
+
+Страницы хранятся по sha256 содержимого (неизменившаяся страница лежит один раз),
+сжатые zstd, если установлен ``zstandard``, иначе gzip. Суммарный размер ограничен
+ARCHIVE_MAX_MB: при переполнении удаляются страницы, к которым дольше всего не
+обращались. Включается непустым ARCHIVE_DIR.
+
+Перепроверить парсеры на сохранённых страницах, не обращаясь к сайтам:
+
+    python -m bot.storage.archive list
+    python -m bot.storage.archive replay --source prada
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+from bot.config import settings
+from bot.utils.clock import clock
+
+try:
+    import zstandard
+except ImportError:  # необязательная зависимость
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ArchivedPage:
+    id: int
+    source: str
+    day: str
+    url: str
+    fetched_at: float
+    digest: str
+
+
+class PageArchive:
+    """Хранилище страниц с адресацией по содержимому и LRU-вытеснением по размеру"""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+        # Пишут потоки скрейпа, поэтому одно соединение под общей блокировкой
+        self._conn = sqlite3.connect(os.path.join(root, "index.db"), timeout=10, check_same_thread=False)
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS blobs (
+                    digest TEXT PRIMARY KEY,
+                    codec TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            ''')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS pages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    source TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    digest TEXT NOT NULL
+                )
+            ''')
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_blobs_last_access ON blobs (last_access)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_pages_digest ON pages (digest)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_pages_source_day ON pages (source, day)")
+            # Неизменившаяся страница, скачанная повторно, новой записи не добавляет:
+            # иначе индекс растёт с каждой предзагрузкой, а лимит считает только блобы.
+            # Дубликаты из старых архивов схлопываются до первой загрузки.
+            self._conn.execute(
+                "DELETE FROM pages WHERE id NOT IN (SELECT MIN(id) FROM pages GROUP BY source, day, digest)"
+            )
+            self._conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ux_pages_source_day_digest ON pages (source, day, digest)"
+            )
+
+    def _blob_path(self, digest: str, codec: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], f"{digest}.html.{codec}")
+
+    @staticmethod
+    def _compress(data: bytes) -> tuple[str, bytes]:
+        if zstandard is not None:
+            return "zst", zstandard.ZstdCompressor(level=10).compress(data)
+        return "gz", gzip.compress(data, compresslevel=6)
+
+    @staticmethod
+    def _decompress(codec: str, data: bytes) -> bytes:
+        if codec == "zst":
+            if zstandard is None:
+                raise RuntimeError("Страница сжата zstd, а zstandard не установлен")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def store(self, source: str, day: date, url: str, html: str) -> str:
+        """Сохраняет страницу; возвращает её sha256"""
+        raw = html.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT codec FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if row is None:
+                codec, packed = self._compress(raw)
+                path = self._blob_path(digest, codec)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(packed)
+                os.replace(tmp, path)
+                self._conn.execute(
+                    "INSERT INTO blobs (digest, codec, size, last_access) VALUES (?, ?, ?, ?)",
+                    (digest, codec, len(packed), now),
+                )
+            else:
+                self._conn.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (now, digest))
+            self._conn.execute(
+                "INSERT OR IGNORE INTO pages (source, day, url, fetched_at, digest) VALUES (?, ?, ?, ?, ?)",
+                (source, day.isoformat(), url, now, digest),
+            )
+            if row is None:
+                self._evict()
+        return digest
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for digest, codec, size in self._conn.execute(
+            "SELECT digest, codec, size FROM blobs ORDER BY last_access"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._blob_path(digest, codec))
+            except FileNotFoundError:
+                pass
+            self._conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+            self._conn.execute("DELETE FROM pages WHERE digest = ?", (digest,))
+            total -= size
+
+    def load(self, digest: str) -> str:
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT codec FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if row is None:
+                raise KeyError(digest)
+            self._conn.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (time.time(), digest))
+        with open(self._blob_path(digest, row[0]), "rb") as f:
+            return self._decompress(row[0], f.read()).decode("utf-8")
+
+    def pages(self, source: Optional[str] = None, unique: bool = False) -> Iterator[ArchivedPage]:
+        """Записи архива по порядку загрузки; ``unique`` — только первая запись каждой версии страницы"""
+        query = "SELECT id, source, day, url, fetched_at, digest FROM pages"
+        params: tuple = ()
+        if source:
+            query += " WHERE source = ?"
+            params = (source,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY id", params).fetchall()
+        seen = set()
+        for row in rows:
+            page = ArchivedPage(*row)
+            if unique:
+                if page.digest in seen:
+                    continue
+                seen.add(page.digest)
+            yield page
+
+    def total_size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+
+_archive: Optional[PageArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> Optional[PageArchive]:
+    """Архив из настроек или None, если ARCHIVE_DIR не задан"""
+    global _archive
+    if _archive is None and settings.ARCHIVE_DIR:
+        with _archive_lock:
+            if _archive is None:
+                _archive = PageArchive(settings.ARCHIVE_DIR, settings.ARCHIVE_MAX_MB * 1024 * 1024)
+    return _archive
+
+
+def archive_page(source: str, day: date, url: str, html: str) -> None:
+    """Сохраняет страницу, если архив включён; ошибки архива не мешают скрейпу"""
+    archive = get_archive()
+    if archive is None or not html:
+        return
+    try:
+        archive.store(source, day, url, html)
+    except Exception as e:
+        logger.warning(f"Не удалось сохранить страницу {source} {day} в архив: {e}")
+
+
+def _replay_prada(html: str, page: ArchivedPage) -> List[str]:
+    from bot.filters import filter_movie_titles
+    from bot.parsers.prada import parse_prada_html
+    # «Сегодня» — день загрузки страницы по Москве, как было при скрейпе
+    fetched = datetime.fromtimestamp(page.fetched_at, clock.tz).date()
+    return filter_movie_titles(parse_prada_html(html, date.fromisoformat(page.day), fetched))
+
+
+def _replay_karo(html: str, page: ArchivedPage) -> List[str]:
+    from bot.filters import filter_movie_titles
+    from bot.parsers.afisha_karo import _parse_titles_from_html
+    return filter_movie_titles(_parse_titles_from_html(html))
+
+
+REPLAYERS: Dict[str, Callable[[str, ArchivedPage], List[str]]] = {
+    "prada": _replay_prada,
+    "karo": _replay_karo,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Архив страниц кинотеатров")
+    parser.add_argument("command", choices=("list", "replay"))
+    parser.add_argument("--source", choices=sorted(REPLAYERS), help="только этот кинотеатр")
+    parser.add_argument("--dir", default=settings.ARCHIVE_DIR, help="каталог архива (по умолчанию ARCHIVE_DIR)")
+    args = parser.parse_args()
+    if not args.dir:
+        parser.error("ARCHIVE_DIR не задан, укажите --dir")
+
+    archive = PageArchive(args.dir, settings.ARCHIVE_MAX_MB * 1024 * 1024)
+    if args.command == "list":
+        for page in archive.pages(args.source):
+            fetched = time.strftime("%Y-%m-%d %H:%M", time.localtime(page.fetched_at))
+            print(f"{page.id:>6} {page.source:<10} {page.day} {fetched} {page.digest[:12]}")
+        print(f"Всего: {archive.total_size() / 1024:.0f} KiB")
+        return
+
+    for page in archive.pages(args.source, unique=True):
+        replay = REPLAYERS.get(page.source)
+        if replay is None:
+            continue
+        titles = replay(archive.load(page.digest), page)
+        print(f"{page.source} {page.day} ({page.digest[:12]}): {len(titles)}")
+        for title in titles:
+            print(f"    {title}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Импорт и экспорт событий файлами CSV и ICS.
+
+Файлы читаются и пишутся построчно: в памяти никогда не лежит больше одной
+записи, поэтому десятки тысяч событий обрабатываются в фиксированном объёме памяти.
+
+CSV: ``date,name[,time[,offsets]]`` — дата YYYY-MM-DD или ДД.ММ.ГГГГ, время ЧЧ:ММ,
+смещения напоминаний как в /event_offsets: ``"7d,1d"`` в кавычках или без них
+(тогда все ячейки после времени — смещения). Строка заголовка необязательна.
+ICS: из каждого VEVENT берутся DTSTART и SUMMARY.
+"""
+from __future__ import annotations
+
+import csv
+import io
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+import pytz
+
+from bot.utils.clock import clock
+from bot.utils.reminder_times import format_offsets, parse_offsets
+
+# (name, event_date, event_time, offsets)
+EventRow = Tuple[str, str, Optional[str], Optional[str]]
+
+CSV_HEADER = ["date", "name", "time", "offsets"]
+MAX_NAME_LEN = 200
+# Сколько ошибок разбора показывать пользователю
+MAX_REPORTED_ERRORS = 10
+
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    skipped_past: int = 0
+    invalid: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def error(self, where: str, text: str) -> None:
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"{where}: {text}")
+
+
+def _parse_date(value: str) -> date:
+    value = value.strip()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, "%d.%m.%Y").date()
+
+
+def _validated(name: str, day: date, at: Optional[time], offsets: Optional[str],
+               where: str, stats: ImportStats, today: date) -> Optional[EventRow]:
+    name = " ".join(name.split())
+    if not name:
+        stats.error(where, "пустое название")
+        return None
+    if day < today:
+        stats.skipped_past += 1
+        return None
+    if offsets:
+        offsets = format_offsets(parse_offsets(offsets))
+    return name[:MAX_NAME_LEN], day.isoformat(), at.strftime("%H:%M") if at else None, offsets or None
+
+
+def read_csv(f: IO[str], stats: ImportStats) -> Iterator[EventRow]:
+    today = clock.today()
+    for lineno, record in enumerate(csv.reader(f), 1):
+        if not record or not any(cell.strip() for cell in record):
+            continue
+        if lineno == 1 and record[0].strip().lower() == "date":
+            continue
+        stats.read += 1
+        where = f"строка {lineno}"
+        try:
+            day = _parse_date(record[0])
+            name = record[1] if len(record) > 1 else ""
+            at = time.fromisoformat(record[2].strip().zfill(5)) if len(record) > 2 and record[2].strip() else None
+            offsets = ",".join(record[3:]) if len(record) > 3 else None
+            row = _validated(name, day, at, offsets, where, stats, today)
+        except (ValueError, IndexError) as e:
+            stats.error(where, str(e))
+            continue
+        if row:
+            yield row
+
+
+def _unfolded(lines: Iterable[str]) -> Iterator[Tuple[int, str]]:
+    # RFC 5545: строка, начинающаяся с пробела или таба, продолжает предыдущую
+    current, start = "", 0
+    for lineno, raw in enumerate(lines, 1):
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current:
+            current += line[1:]
+            continue
+        if current:
+            yield start, current
+        current, start = line, lineno
+    if current:
+        yield start, current
+
+
+def _ics_unescape(value: str) -> str:
+    return value.replace("\\n", " ").replace("\\N", " ").replace("\\,", ",").replace("\\;", ";").replace("\\\\", "\\")
+
+
+def _ics_start(params: str, value: str) -> Tuple[date, Optional[time]]:
+    value = value.strip()
+    if len(value) == 8 or "VALUE=DATE" in params.upper() and "T" not in value:
+        return datetime.strptime(value[:8], "%Y%m%d").date(), None
+    moment = datetime.strptime(value.rstrip("Z"), "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        moment = pytz.utc.localize(moment).astimezone(clock.tz)
+    else:
+        tzid = next((p.split("=", 1)[1] for p in params.split(";") if p.upper().startswith("TZID=")), None)
+        if tzid:
+            moment = pytz.timezone(tzid).localize(moment).astimezone(clock.tz)
+    return moment.date(), moment.time().replace(second=0)
+
+
+def read_ics(f: IO[str], stats: ImportStats) -> Iterator[EventRow]:
+    today = clock.today()
+    in_event, summary, start, where = False, "", None, ""
+    for lineno, line in _unfolded(f):
+        name, _, value = line.partition(":")
+        key, _, params = name.partition(";")
+        key = key.upper()
+        if key == "BEGIN" and value.strip().upper() == "VEVENT":
+            in_event, summary, start, where = True, "", None, f"строка {lineno}"
+        elif key == "END" and value.strip().upper() == "VEVENT" and in_event:
+            in_event = False
+            stats.read += 1
+            if start is None:
+                stats.error(where, "нет DTSTART")
+                continue
+            row = _validated(summary, start[0], start[1], None, where, stats, today)
+            if row:
+                yield row
+        elif in_event and key == "SUMMARY":
+            summary = _ics_unescape(value)
+        elif in_event and key == "DTSTART":
+            try:
+                start = _ics_start(params, value)
+            except (ValueError, pytz.UnknownTimeZoneError) as e:
+                stats.error(where, f"DTSTART: {e}")
+                in_event = False
+
+
+def read_events(f: IO[str], filename: str, stats: ImportStats) -> Iterator[EventRow]:
+    if filename.lower().endswith((".ics", ".ical")):
+        return read_ics(f, stats)
+    return read_csv(f, stats)
+
+
+def write_csv(out: IO[str], rows: Iterable[Tuple]) -> int:
+    """rows: (id, name, event_date, event_time, offsets)"""
+    writer = csv.writer(out)
+    writer.writerow(CSV_HEADER)
+    count = 0
+    for _, name, event_date, event_time, offsets in rows:
+        writer.writerow([event_date, name, event_time or "", offsets or ""])
+        count += 1
+    return count
+
+
+def _ics_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def write_ics(out: IO[str], rows: Iterable[Tuple]) -> int:
+    out.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//kino_tg_bot//events//RU\r\n")
+    count = 0
+    for event_id, name, event_date, event_time, _ in rows:
+        day = event_date.replace("-", "")
+        if event_time:
+            start = f"DTSTART;TZID={clock.tz.zone}:{day}T{event_time.replace(':', '')}00"
+        else:
+            start = f"DTSTART;VALUE=DATE:{day}"
+        out.write(f"BEGIN:VEVENT\r\nUID:event-{event_id}@kino_tg_bot\r\n{start}\r\nSUMMARY:{_ics_escape(name)}\r\nEND:VEVENT\r\n")
+        count += 1
+    out.write("END:VCALENDAR\r\n")
+    return count
+
+
+def open_text(path: str) -> IO[str]:
+    """Текстовый файл с автоопределением UTF-8 BOM; битые байты не роняют импорт"""
+    return io.open(path, "r", encoding="utf-8-sig", errors="replace", newline="")
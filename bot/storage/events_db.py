@@ -1,20 +1,32 @@
 import sqlite3
 import os
 import datetime
+import time
 from bot.config import settings
+from bot.utils.reminder_times import next_fire_at
 from bot.utils.time_utils import is_date_in_future
 
-# Создаем директорию для базы данных, если ее нет
-os.makedirs(os.path.dirname(settings.EVENTS_DB_PATH), exist_ok=True)
+# Колонки напоминаний, добавленные к events после первой версии схемы
+EVENT_REMINDER_COLUMNS = {
+    "event_time": "TEXT",
+    "offsets": "TEXT",
+    "next_fire_at": "REAL",
+    "last_fired_at": "REAL",
+}
 
 class DatabaseError(Exception):
     """Пользовательское исключение для ошибок базы данных"""
     pass
 
 def init_db():
-    """Инициализирует базу данных, создавая необходимые таблицы"""
+    """Инициализирует базу данных, создавая необходимые таблицы.
+
+    Вызывается один раз из main() при старте, а не при импорте модуля.
+    """
     conn = None  # Инициализируем conn как None
     try:
+        # Создаем директорию для базы данных, если ее нет
+        os.makedirs(os.path.dirname(settings.EVENTS_DB_PATH) or ".", exist_ok=True)
         conn = sqlite3.connect(settings.EVENTS_DB_PATH)  # Исправлено: settings.EVENTS_DB_PATH вместо EVENTS_DB_PATH
         cursor = conn.cursor()
 
@@ -28,6 +40,7 @@ def init_db():
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        _migrate_events(cursor)
 
         # Создаем таблицу настроек
         cursor.execute('''
@@ -37,6 +50,26 @@ def init_db():
             )
         ''')
 
+        # Создаем таблицу последних запусков задач планировщика
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS job_runs (
+                job_id TEXT PRIMARY KEY,
+                run_key TEXT NOT NULL,
+                finished_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Создаем таблицу подписок на новые фильмы: kind — cinema, keyword или title
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS subscriptions (
+                chat_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (chat_id, kind, value)
+            )
+        ''')
+
         # Добавляем дефолтное значение для default_group, если его нет
         cursor.execute('''
             INSERT OR IGNORE INTO settings (key, value)
@@ -50,21 +83,43 @@ def init_db():
         if conn:
             conn.close()
 
-def add_event(name: str, event_date_str: str, group_chat_id: int):
-    """Добавляет новое событие в базу данных с валидацией"""
+def _migrate_events(cursor):
+    """Добавляет колонки напоминаний в старую таблицу events и считает для неё next_fire_at"""
+    existing = {row[1] for row in cursor.execute('PRAGMA table_info(events)')}
+    for column, kind in EVENT_REMINDER_COLUMNS.items():
+        if column not in existing:
+            cursor.execute(f'ALTER TABLE events ADD COLUMN {column} {kind}')
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_events_next_fire_at ON events (next_fire_at)')
+
+    # События, для которых напоминания ещё ни разу не планировались
+    now = time.time()
+    rows = cursor.execute('''
+        SELECT id, event_date, event_time, offsets FROM events
+        WHERE next_fire_at IS NULL AND last_fired_at IS NULL
+    ''').fetchall()
+    cursor.executemany(
+        'UPDATE events SET next_fire_at = ?, last_fired_at = 0 WHERE id = ?',
+        [(next_fire_at(d, t, o, now), event_id) for event_id, d, t, o in rows],
+    )
+
+def add_event(name: str, event_date_str: str, group_chat_id: int, event_time: str = None, offsets: str = None):
+    """Добавляет новое событие в базу данных с валидацией; возвращает его id"""
+    conn = None
     try:
         # Валидация даты с учетом часового пояса
         if not is_date_in_future(event_date_str):
             raise ValueError("Дата не может быть в прошлом или сегодняшней")
+        fire_at = next_fire_at(event_date_str, event_time, offsets, time.time())
 
         # Подключение к БД
         conn = sqlite3.connect(settings.EVENTS_DB_PATH)
         cursor = conn.cursor()
         cursor.execute('''
-            INSERT INTO events (name, event_date, group_chat_id)
-            VALUES (?, ?, ?)
-        ''', (name, event_date_str, group_chat_id))
+            INSERT INTO events (name, event_date, group_chat_id, event_time, offsets, next_fire_at, last_fired_at)
+            VALUES (?, ?, ?, ?, ?, ?, 0)
+        ''', (name, event_date_str, group_chat_id, event_time, offsets, fire_at))
         conn.commit()
+        return cursor.lastrowid
     except (sqlite3.Error, ValueError) as e:
         raise DatabaseError(f"Ошибка при добавлении события: {e}")
     finally:
@@ -128,4 +183,219 @@ def get_default_group():
         if conn:
             conn.close()
 
-init_db()
\ No newline at end of file
+def get_last_job_run(job_id: str):
+    """Получает ключ последнего успешного запуска задачи (например, дату) или None"""
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.EVENTS_DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute('SELECT run_key FROM job_runs WHERE job_id = ?', (job_id,))
+        result = cursor.fetchone()
+        return result[0] if result else None
+    except sqlite3.Error as e:
+        raise DatabaseError(f"Ошибка при получении запуска задачи: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+def set_last_job_run(job_id: str, run_key: str):
+    """Запоминает ключ успешного запуска задачи"""
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.EVENTS_DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO job_runs (job_id, run_key, finished_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+        ''', (job_id, run_key))
+        conn.commit()
+    except sqlite3.Error as e:
+        raise DatabaseError(f"Ошибка при сохранении запуска задачи: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+def add_subscription(chat_id: int, kind: str, value: str) -> bool:
+    """Добавляет подписку; False, если такая уже есть"""
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.EVENTS_DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR IGNORE INTO subscriptions (chat_id, kind, value)
+            VALUES (?, ?, ?)
+        ''', (chat_id, kind, value))
+        conn.commit()
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        raise DatabaseError(f"Ошибка при добавлении подписки: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+def delete_subscription(chat_id: int, kind: str, value: str) -> bool:
+    """Удаляет подписку; False, если такой не было"""
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.EVENTS_DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM subscriptions WHERE chat_id = ? AND kind = ? AND value = ?', (chat_id, kind, value))
+        conn.commit()
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        raise DatabaseError(f"Ошибка при удалении подписки: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+def delete_chat_subscriptions(chat_ids):
+    """Удаляет все подписки чатов (например, заблокировавших бота) одной транзакцией"""
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.EVENTS_DB_PATH)
+        with conn:
+            conn.executemany('DELETE FROM subscriptions WHERE chat_id = ?', [(c,) for c in chat_ids])
+    except sqlite3.Error as e:
+        raise DatabaseError(f"Ошибка при удалении подписок: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+def get_subscriptions(chat_id: int = None):
+    """Подписки чата (kind, value) или, без chat_id, все подписки (chat_id, kind, value)"""
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.EVENTS_DB_PATH)
+        cursor = conn.cursor()
+        if chat_id is None:
+            cursor.execute('SELECT chat_id, kind, value FROM subscriptions')
+        else:
+            cursor.execute('SELECT kind, value FROM subscriptions WHERE chat_id = ? ORDER BY kind, value', (chat_id,))
+        return cursor.fetchall()
+    except sqlite3.Error as e:
+        raise DatabaseError(f"Ошибка при получении подписок: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+def set_event_offsets(event_id: int, offsets: str):
+    """Меняет смещения напоминаний события и пересчитывает ближайшее; возвращает next_fire_at"""
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.EVENTS_DB_PATH)
+        cursor = conn.cursor()
+        row = cursor.execute(
+            'SELECT event_date, event_time, last_fired_at FROM events WHERE id = ?', (event_id,)
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"События #{event_id} нет")
+        event_date, event_time, last_fired_at = row
+        # Уже отправленные напоминания не повторяются
+        fire_at = next_fire_at(event_date, event_time, offsets, max(time.time(), last_fired_at or 0))
+        cursor.execute('UPDATE events SET offsets = ?, next_fire_at = ? WHERE id = ?', (offsets, fire_at, event_id))
+        conn.commit()
+        return fire_at
+    except (sqlite3.Error, ValueError) as e:
+        raise DatabaseError(f"Ошибка при изменении напоминаний: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+def get_due_reminders(after: float, until: float):
+    """(id, next_fire_at) событий с напоминанием в полуинтервале (after, until] по индексу"""
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.EVENTS_DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, next_fire_at FROM events
+            WHERE next_fire_at > ? AND next_fire_at <= ?
+            ORDER BY next_fire_at
+        ''', (after, until))
+        return cursor.fetchall()
+    except sqlite3.Error as e:
+        raise DatabaseError(f"Ошибка при получении напоминаний: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+def get_event(event_id: int):
+    """(id, name, event_date, event_time, offsets, group_chat_id, next_fire_at) или None"""
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.EVENTS_DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, name, event_date, event_time, offsets, group_chat_id, next_fire_at
+            FROM events WHERE id = ?
+        ''', (event_id,))
+        return cursor.fetchone()
+    except sqlite3.Error as e:
+        raise DatabaseError(f"Ошибка при получении события: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+def claim_reminder(event_id: int, fire_at: float, next_at):
+    """Отмечает напоминание ``fire_at`` отправленным и переводит событие на следующее.
+
+    Срабатывает, только если next_fire_at всё ещё равен ``fire_at``: напоминание
+    не уйдёт дважды ни после рестарта, ни с двух реплик.
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.EVENTS_DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE events SET last_fired_at = ?, next_fire_at = ?
+            WHERE id = ? AND next_fire_at = ?
+        ''', (fire_at, next_at, event_id, fire_at))
+        conn.commit()
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        raise DatabaseError(f"Ошибка при сохранении напоминания: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+def import_events(rows, group_chat_id: int):
+    """Добавляет события из итератора (name, event_date, event_time, offsets) одной транзакцией.
+
+    Итератор потребляется по одной строке, поэтому размер импорта не ограничен памятью.
+    При ошибке БД откатывается весь импорт. Возвращает число добавленных событий.
+    """
+    now = time.time()
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.EVENTS_DB_PATH)
+        with conn:
+            cursor = conn.executemany('''
+                INSERT INTO events (name, event_date, group_chat_id, event_time, offsets, next_fire_at, last_fired_at)
+                VALUES (?, ?, ?, ?, ?, ?, 0)
+            ''', (
+                (name, event_date, group_chat_id, event_time, offsets, next_fire_at(event_date, event_time, offsets, now))
+                for name, event_date, event_time, offsets in rows
+            ))
+        return cursor.rowcount
+    except (sqlite3.Error, ValueError) as e:
+        raise DatabaseError(f"Ошибка при импорте событий: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+def iter_events(batch_size: int = 500):
+    """Все события (id, name, event_date, event_time, offsets) порциями, без загрузки таблицы в память"""
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.EVENTS_DB_PATH)
+        cursor = conn.execute('SELECT id, name, event_date, event_time, offsets FROM events ORDER BY event_date, id')
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            yield from batch
+    except sqlite3.Error as e:
+        raise DatabaseError(f"Ошибка при выгрузке событий: {e}")
+    finally:
+        if conn:
+            conn.close()
@@ -0,0 +1,147 @@
+import pickle
+import sqlite3
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+
+from bot.config import settings
+
+
+class SQLiteJobStore(BaseJobStore):
+    """Хранилище задач APScheduler в файле БД событий (на чистом sqlite3, без SQLAlchemy).
+
+    Повторяет формат SQLAlchemyJobStore: id, next_run_time (UTC timestamp)
+    и состояние задачи в pickle. Функция задачи должна быть доступна по текстовой
+    ссылке ``модуль:имя``, а аргументы — сериализуемыми.
+    """
+
+    def __init__(self, path: str = "", table: str = "apscheduler_jobs",
+                 pickle_protocol: int = pickle.HIGHEST_PROTOCOL):
+        super().__init__()
+        self.path = path or settings.EVENTS_DB_PATH
+        self.table = table
+        self.pickle_protocol = pickle_protocol
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        conn = self._connect()
+        try:
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    id TEXT PRIMARY KEY,
+                    next_run_time REAL,
+                    job_state BLOB NOT NULL
+                )
+            ''')
+            conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.table}_next_run_time ON {self.table} (next_run_time)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def lookup_job(self, job_id):
+        jobs = self._get_jobs("WHERE id = ?", (job_id,))
+        return jobs[0] if jobs else None
+
+    def get_due_jobs(self, now):
+        return self._get_jobs("WHERE next_run_time <= ?", (datetime_to_utc_timestamp(now),))
+
+    def get_next_run_time(self):
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                f"SELECT next_run_time FROM {self.table} WHERE next_run_time IS NOT NULL "
+                "ORDER BY next_run_time LIMIT 1"
+            ).fetchone()
+            return utc_timestamp_to_datetime(row[0]) if row else None
+        finally:
+            conn.close()
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        conn = self._connect()
+        try:
+            conn.execute(
+                f"INSERT INTO {self.table} (id, next_run_time, job_state) VALUES (?, ?, ?)",
+                (job.id, datetime_to_utc_timestamp(job.next_run_time), self._dump(job)),
+            )
+            conn.commit()
+        except sqlite3.IntegrityError:
+            raise ConflictingIdError(job.id)
+        finally:
+            conn.close()
+
+    def update_job(self, job):
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                f"UPDATE {self.table} SET next_run_time = ?, job_state = ? WHERE id = ?",
+                (datetime_to_utc_timestamp(job.next_run_time), self._dump(job), job.id),
+            )
+            conn.commit()
+            if cur.rowcount == 0:
+                raise JobLookupError(job.id)
+        finally:
+            conn.close()
+
+    def remove_job(self, job_id):
+        conn = self._connect()
+        try:
+            cur = conn.execute(f"DELETE FROM {self.table} WHERE id = ?", (job_id,))
+            conn.commit()
+            if cur.rowcount == 0:
+                raise JobLookupError(job_id)
+        finally:
+            conn.close()
+
+    def remove_all_jobs(self):
+        conn = self._connect()
+        try:
+            conn.execute(f"DELETE FROM {self.table}")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _dump(self, job) -> bytes:
+        return pickle.dumps(job.__getstate__(), self.pickle_protocol)
+
+    def _reconstitute_job(self, job_state):
+        job_state = pickle.loads(job_state)
+        job_state["jobstore"] = self
+        job = Job.__new__(Job)
+        job.__setstate__(job_state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _get_jobs(self, where: str = "", params: tuple = ()):
+        jobs = []
+        failed_job_ids = []
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT id, job_state FROM {self.table} {where} ORDER BY next_run_time", params
+            ).fetchall()
+            for job_id, state in rows:
+                try:
+                    jobs.append(self._reconstitute_job(state))
+                except BaseException:
+                    self._logger.exception('Unable to restore job "%s" -- removing it', job_id)
+                    failed_job_ids.append(job_id)
+            # Удаляем задачи, которые не удалось восстановить
+            if failed_job_ids:
+                conn.executemany(f"DELETE FROM {self.table} WHERE id = ?", [(i,) for i in failed_job_ids])
+                conn.commit()
+        finally:
+            conn.close()
+        return jobs
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} (path={self.path})>"
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Mapping
+
+from .storage import DATA_DIR
+
+SNAPSHOTS_PATH = os.path.join(DATA_DIR, "snapshots.json")
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(titles: List[str]) -> str:
+    return hashlib.sha1("\n".join(sorted(set(titles))).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CinemaDiff:
+    """Изменения расписания одного кинотеатра между двумя снимками окна"""
+    added_titles: List[str] = field(default_factory=list)
+    removed_titles: List[str] = field(default_factory=list)
+    # iso-дата -> фильмы, у которых на эту дату появились/пропали сеансы
+    added_sessions: Dict[str, List[str]] = field(default_factory=dict)
+    removed_sessions: Dict[str, List[str]] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.added_titles or self.removed_titles or self.added_sessions or self.removed_sessions)
+
+    def dates_for(self, title: str) -> List[str]:
+        return sorted(iso for iso, titles in self.added_sessions.items() if title in titles)
+
+
+@dataclass
+class SnapshotStore:
+    """Последний снимок расписания по (кинотеатр, дата) и инкрементальный дифф к нему.
+
+    Для каждой даты хранится дайджест списка фильмов: неизменившиеся даты отсекаются
+    сравнением дайджестов, а множества сравниваются только для изменившихся.
+    Счётчик «на скольких датах окна идёт фильм» позволяет определить появление
+    и исчезновение фильма в окне без полного пересчёта.
+    """
+    path: str = SNAPSHOTS_PATH
+    # cinema -> iso-дата -> {"digest": ..., "titles": [...], "empty_seen": пустой снимок ждёт подтверждения}
+    _data: Dict[str, Dict[str, dict]] = field(default_factory=dict)
+    _counts: Dict[str, Counter] = field(default_factory=dict)
+    _dirty: bool = False
+
+    def __post_init__(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except Exception:
+                self._data = {}
+        for cinema, days in self._data.items():
+            counts = self._counts.setdefault(cinema, Counter())
+            for entry in days.values():
+                counts.update(entry["titles"])
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=2)
+        self._dirty = False
+
+    def titles_for(self, cinema: str, day: date) -> List[str]:
+        return list(self._data.get(cinema, {}).get(day.isoformat(), {}).get("titles", []))
+
+    def prune(self, today: date) -> None:
+        """Молча убирает прошедшие даты — это не снятие фильма с показа"""
+        cutoff = today.isoformat()
+        for cinema, days in self._data.items():
+            for iso in [iso for iso in days if iso < cutoff]:
+                self._counts[cinema].subtract(days.pop(iso)["titles"])
+                self._dirty = True
+            self._counts[cinema] = +self._counts[cinema]
+
+    def apply(self, cinema: str, snapshot: Mapping[date, List[str]]) -> CinemaDiff:
+        """Применяет свежие данные по датам кинотеатра и возвращает дельту.
+
+        Даты, которых нет в ``snapshot`` (например, не удалось скачать), не трогаются.
+        Если дата с фильмами вдруг пришла пустой (капча, сломанная страница), это
+        принимается только со второго снимка подряд: иначе ложное «сняты с показа»
+        и повторное «новые фильмы» на следующей проверке.
+        Первый снимок кинотеатра только запоминается: иначе всё окно оказалось бы «новым».
+        """
+        diff = CinemaDiff()
+        initial = not self._data.get(cinema)
+        days = self._data.setdefault(cinema, {})
+        counts = self._counts.setdefault(cinema, Counter())
+        before: Dict[str, int] = {}
+
+        for day, titles in snapshot.items():
+            iso = day.isoformat()
+            digest = _digest(titles)
+            prev = days.get(iso)
+            if prev is not None and prev["digest"] == digest:
+                if prev.pop("empty_seen", False):
+                    self._dirty = True
+                continue
+            if prev is not None and prev["titles"] and not titles and not prev.get("empty_seen"):
+                prev["empty_seen"] = True
+                self._dirty = True
+                logger.info(f"{cinema} на {iso}: пустое расписание, ждём подтверждения следующим снимком")
+                continue
+            old = set(prev["titles"]) if prev else set()
+            new = set(titles)
+            added, removed = new - old, old - new
+            for t in added | removed:
+                before.setdefault(t, counts[t])
+            counts.update(added)
+            counts.subtract(removed)
+            if added:
+                diff.added_sessions[iso] = sorted(added)
+            if removed:
+                diff.removed_sessions[iso] = sorted(removed)
+            days[iso] = {"digest": digest, "titles": sorted(new)}
+            self._dirty = True
+
+        self._counts[cinema] = +counts
+        if initial:
+            logger.info(f"Первый снимок расписания {cinema}: {len(self._counts[cinema])} фильмов")
+            return CinemaDiff()
+
+        for t, was in before.items():
+            now = self._counts[cinema][t]
+            if was == 0 and now > 0:
+                diff.added_titles.append(t)
+            elif was > 0 and now == 0:
+                diff.removed_titles.append(t)
+        diff.added_titles.sort()
+        diff.removed_titles.sort()
+        return diff
+
+    def update(self, today: date, snapshot: Mapping[str, Mapping[date, List[str]]]) -> Dict[str, CinemaDiff]:
+        """Сдвигает окно на ``today``, применяет снимок всех кинотеатров и сохраняет изменения"""
+        self.prune(today)
+        diffs: Dict[str, CinemaDiff] = {}
+        for cinema, days in snapshot.items():
+            diff = self.apply(cinema, days)
+            if diff:
+                diffs[cinema] = diff
+        self.save()
+        return diffs
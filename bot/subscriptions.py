@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import date
+from html import escape
+from typing import Dict, Iterable, List, Mapping, Set, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+
+from bot.config import settings
+from bot.storage import events_db
+from .storage.snapshots import CinemaDiff
+from .titles import canonical_key
+
+logger = logging.getLogger(__name__)
+
+# chat_id -> cinema -> новые фильмы, подходящие под подписки чата
+Matches = Dict[int, Dict[str, List[str]]]
+
+
+class SubscriptionIndex:
+    """Подписки всех чатов, разложенные по ключам поиска.
+
+    Подписчики кинотеатра и любимого фильма находятся одним обращением к словарю,
+    ключевые слова — по первому слову фразы с проверкой остальных. Поэтому сверка
+    новых фильмов с подписками стоит O(число новых фильмов × слов в названии)
+    и не зависит от числа подписчиков, кроме самих найденных совпадений.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, str, str]]):
+        self.by_cinema: Dict[str, Set[int]] = {}
+        self.by_title: Dict[str, Set[int]] = {}
+        self.by_word: Dict[str, List[Tuple[int, Tuple[str, ...]]]] = {}
+        for chat_id, kind, value in rows:
+            if kind == "cinema":
+                self.by_cinema.setdefault(value, set()).add(chat_id)
+            elif kind == "title":
+                self.by_title.setdefault(value, set()).add(chat_id)
+            elif kind == "keyword":
+                words = tuple(value.split())
+                if words:
+                    self.by_word.setdefault(words[0], []).append((chat_id, words))
+
+    def __bool__(self) -> bool:
+        return bool(self.by_cinema or self.by_title or self.by_word)
+
+    def subscribers_for(self, cinema: str, title: str) -> Set[int]:
+        key = canonical_key(title)
+        chats = set(self.by_cinema.get(cinema, ()))
+        chats.update(self.by_title.get(key, ()))
+        words = key.split()
+        present = set(words)
+        for word in present:
+            for chat_id, phrase in self.by_word.get(word, ()):
+                if chat_id not in chats and all(w in present for w in phrase[1:]):
+                    chats.add(chat_id)
+        return chats
+
+    def match(self, diffs: Mapping[str, CinemaDiff]) -> Matches:
+        """Один проход по новым фильмам всех кинотеатров"""
+        result: Matches = {}
+        for cinema, diff in diffs.items():
+            for title in diff.added_titles:
+                for chat_id in self.subscribers_for(cinema, title):
+                    result.setdefault(chat_id, {}).setdefault(cinema, []).append(title)
+        return result
+
+
+def render_matches(found: Dict[str, List[str]], diffs: Mapping[str, CinemaDiff]) -> str:
+    lines = ["🎬 Новое в афише по вашим подпискам:"]
+    for cinema, titles in found.items():
+        lines.append(f"\n<b>{cinema}</b>:")
+        for title in titles:
+            dates = ", ".join(date.fromisoformat(iso).strftime("%d.%m") for iso in diffs[cinema].dates_for(title))
+            lines.append(f"{escape(title)} ({dates})" if dates else escape(title))
+    return "\n".join(lines)
+
+
+async def send_many(bot: Bot, messages: Mapping[int, str], concurrency: int | None = None) -> Set[int]:
+    """Рассылает сообщения не больше чем ``concurrency`` одновременно.
+
+    При flood-limit ждёт, сколько просит Telegram, и повторяет. Возвращает чаты,
+    которые заблокировали бота: их подписки больше не нужны.
+    """
+    sem = asyncio.Semaphore(concurrency or settings.NOTIFY_CONCURRENCY)
+    blocked: Set[int] = set()
+
+    async def one(chat_id: int, text: str) -> None:
+        async with sem:
+            for _ in range(3):
+                try:
+                    await bot.send_message(chat_id=chat_id, text=text)
+                    return
+                except TelegramRetryAfter as e:
+                    await asyncio.sleep(e.retry_after)
+                except TelegramForbiddenError:
+                    blocked.add(chat_id)
+                    return
+                except Exception as e:
+                    logger.warning(f"Не удалось отправить уведомление в {chat_id}: {e}")
+                    return
+
+    await asyncio.gather(*(one(chat_id, text) for chat_id, text in messages.items()))
+    return blocked
+
+
+async def notify_subscribers(bot: Bot, diffs: Mapping[str, CinemaDiff]) -> int:
+    """Уведомляет подписчиков о новых фильмах из диффа снимка; возвращает число сообщений"""
+    if not any(diff.added_titles for diff in diffs.values()):
+        return 0
+    index = SubscriptionIndex(events_db.get_subscriptions())
+    if not index:
+        return 0
+    matches = index.match(diffs)
+    messages = {chat_id: render_matches(found, diffs) for chat_id, found in matches.items()}
+    blocked = await send_many(bot, messages)
+    if blocked:
+        events_db.delete_chat_subscriptions(blocked)
+        logger.info(f"Удалены подписки {len(blocked)} чат(ов), заблокировавших бота")
+    return len(messages)
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .filters import clean_title
+
+# Технические пометки, которые разные сайты дописывают к названию
+FORMAT_TAGS_RE = re.compile(
+    r"\b(?:2d|3d|4dx|imax|screenx|dolby\s*atmos|atmos|hfr|субтитры|в\s+оригинале|премьера|"
+    r"предпоказ|спецпоказ)\b",
+    re.IGNORECASE,
+)
+AGE_RATING_RE = re.compile(r"\(?\b\d{1,2}\s?\+\)?")
+YEAR_SUFFIX_RE = re.compile(r"[\s,(\[]+(?:19|20)\d{2}[)\]]?\s*$")
+NON_WORD_RE = re.compile(r"[^\w]+")
+DIGITS_RE = re.compile(r"\d+")
+QUOTES_RE = re.compile(r"[\'\"«»“”‘’]")
+
+# Слияние названий из разных кинотеатров: коэффициент Жаккара по триграммам.
+# Запрос пользователя обычно короче названия, поэтому для него считается доля
+# триграмм запроса, найденных в названии
+MERGE_THRESHOLD = 0.7
+QUERY_THRESHOLD = 0.6
+# Слишком частые триграммы ничего не различают и только раздувают перебор
+MAX_POSTING = 200
+
+
+def canonical_key(title: str) -> str:
+    """Нормализованный ключ названия: без кавычек, форматов, возраста, года и пунктуации"""
+    t = clean_title(title).lower().replace("ё", "е")
+    t = FORMAT_TAGS_RE.sub(" ", t)
+    t = AGE_RATING_RE.sub(" ", t)
+    t = YEAR_SUFFIX_RE.sub("", t)
+    return NON_WORD_RE.sub(" ", t).strip()
+
+
+def display_title(title: str) -> str:
+    """Название для показа: без кавычек, форматов и возрастной метки, но с годом"""
+    t = QUOTES_RE.sub("", clean_title(title))
+    t = AGE_RATING_RE.sub(" ", FORMAT_TAGS_RE.sub(" ", t))
+    return " ".join(t.split()).strip(" -–—,")
+
+
+def trigrams(key: str) -> Set[str]:
+    grams: Set[str] = set()
+    for word in key.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _numbers(key: str) -> Set[str]:
+    return set(DIGITS_RE.findall(key))
+
+
+@dataclass
+class FilmCluster:
+    """Один фильм во всех кинотеатрах: cinema -> iso-дата -> название как на сайте"""
+    title: str
+    key: str
+    places: Dict[str, Dict[str, str]] = field(default_factory=dict)
+
+    def dates(self, cinema: str) -> List[str]:
+        return sorted(self.places.get(cinema, {}))
+
+
+class TitleIndex:
+    """Индекс канонических названий, общий для всех кинотеатров.
+
+    Точное совпадение ключа — словарь за O(1). Новый ключ сверяется с уже известными
+    через инвертированный индекс триграмм: перебираются только фильмы с общими
+    триграммами, а не все пары. Найденное соответствие запоминается как ещё один
+    ключ того же фильма, поэтому повторно это название снова разрешается за O(1).
+    """
+
+    def __init__(self) -> None:
+        self.clusters: List[FilmCluster] = []
+        self._by_key: Dict[str, int] = {}
+        self._grams: List[Set[str]] = []
+        self._postings: Dict[str, Set[int]] = {}
+        # (cinema, iso) -> id фильмов, уже учтённых для этой даты
+        self._entries: Dict[Tuple[str, str], Set[int]] = {}
+        self._key_listeners: List[Callable[[int, str], None]] = []
+
+    def __len__(self) -> int:
+        return len(self.clusters)
+
+    def subscribe(self, listener: Callable[[int, str], None]) -> None:
+        """``listener(id, key)`` вызывается для каждого нового ключа (и псевдонима) фильма"""
+        self._key_listeners.append(listener)
+
+    def has_entry(self, cinema: str, iso: str) -> bool:
+        return (cinema, iso) in self._entries
+
+    def _overlap(self, grams: Set[str]) -> Counter:
+        overlap: Counter = Counter()
+        for g in grams:
+            ids = self._postings.get(g)
+            if ids and len(ids) <= MAX_POSTING:
+                overlap.update(ids)
+        return overlap
+
+    def _best_match(self, key: str, grams: Set[str]) -> Optional[int]:
+        best, best_score = None, MERGE_THRESHOLD
+        numbers = _numbers(key)
+        for cid, common in self._overlap(grams).items():
+            score = common / (len(grams) + len(self._grams[cid]) - common)
+            # «Фильм 2» и «Фильм 3» похожи по триграммам, но это разные фильмы
+            if score >= best_score and _numbers(self.clusters[cid].key) == numbers:
+                best, best_score = cid, score
+        return best
+
+    def _best_for_query(self, grams: Set[str]) -> Optional[int]:
+        best, best_score = None, (QUERY_THRESHOLD, 0.0)
+        for cid, common in self._overlap(grams).items():
+            score = (common / len(grams), common / (len(grams) + len(self._grams[cid]) - common))
+            if score >= best_score and self.clusters[cid].places:
+                best, best_score = cid, score
+        return best
+
+    def resolve(self, title: str, create: bool = True) -> Optional[int]:
+        """id фильма для названия; с ``create`` неизвестное название заводит новый фильм"""
+        key = canonical_key(title)
+        if not key:
+            return None
+        cid = self._by_key.get(key)
+        if cid is not None:
+            return cid
+        grams = trigrams(key)
+        cid = self._best_match(key, grams)
+        if cid is None:
+            if not create:
+                return None
+            cid = len(self.clusters)
+            self.clusters.append(FilmCluster(title=display_title(title), key=key))
+            self._grams.append(grams)
+            for g in grams:
+                self._postings.setdefault(g, set()).add(cid)
+        self._by_key[key] = cid
+        for listener in self._key_listeners:
+            listener(cid, key)
+        return cid
+
+    def update(self, cinema: str, iso: str, titles: List[str]) -> None:
+        """Заменяет список фильмов кинотеатра на дату (инкрементально, только эту дату)"""
+        new: Dict[int, str] = {}
+        for title in titles:
+            cid = self.resolve(title)
+            if cid is not None:
+                new.setdefault(cid, title)
+        for cid in self._entries.get((cinema, iso), set()) - new.keys():
+            days = self.clusters[cid].places.get(cinema, {})
+            days.pop(iso, None)
+            if not days:
+                self.clusters[cid].places.pop(cinema, None)
+        for cid, title in new.items():
+            self.clusters[cid].places.setdefault(cinema, {})[iso] = title
+        self._entries[(cinema, iso)] = set(new)
+
+    def forget_before(self, iso: str) -> None:
+        """Убирает прошедшие даты из мест показа"""
+        for cinema, day in [e for e in self._entries if e[1] < iso]:
+            self.update(cinema, day, [])
+            del self._entries[(cinema, day)]
+
+    def find(self, query: str) -> Optional[FilmCluster]:
+        """Фильм по запросу пользователя: точный ключ или ближайший по триграммам"""
+        key = canonical_key(query)
+        if not key:
+            return None
+        cid = self._by_key.get(key)
+        if cid is None or not self.clusters[cid].places:
+            cid = self._best_for_query(trigrams(key))
+        return self.clusters[cid] if cid is not None else None
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time as _time
+from datetime import date, datetime, time, timedelta
+from typing import Callable, List, Optional
+
+import pytz
+
+from bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Сколько максимум спать между проверками полуночи: перевод системных часов или
+# сон машины не должны сдвинуть смену дня больше чем на эту величину
+MAX_SLEEP_SEC = 300.0
+
+
+class MoscowClock:
+    """Часы бота в часовом поясе settings.TZ (по умолчанию Москва).
+
+    Часовой пояс разрешается один раз. ``today()`` — сравнение текущего timestamp с
+    заранее посчитанной следующей полуночью, без конвертаций на каждый вызов, и
+    безопасно вызывается из потоков. Подписчики ``on_rollover`` вызываются в цикле
+    событий в момент смены дня: так кэши, клавиатуры и окно предзагрузки
+    переключаются на новую дату ровно в полночь, а не по серверному времени.
+    """
+
+    def __init__(self, tz_name: str = settings.TZ):
+        self.tz = pytz.timezone(tz_name)
+        self._today = date.min
+        self._next_midnight = 0.0
+        self._announced: Optional[date] = None
+        self._listeners: List[Callable[[date], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def now(self) -> datetime:
+        return datetime.now(self.tz)
+
+    def today(self) -> date:
+        if _time.time() >= self._next_midnight:
+            self._roll()
+        return self._today
+
+    def _roll(self) -> None:
+        today = self.now().date()
+        midnight = self.tz.localize(datetime.combine(today + timedelta(days=1), time.min))
+        self._today, self._next_midnight = today, midnight.timestamp()
+
+    def seconds_to_midnight(self) -> float:
+        self.today()
+        return max(0.0, self._next_midnight - _time.time())
+
+    def on_rollover(self, listener: Callable[[date], None]) -> None:
+        """``listener(new_day)`` вызывается в цикле событий при смене дня"""
+        self._listeners.append(listener)
+
+    def _announce(self, day: date) -> None:
+        self._announced = day
+        for listener in self._listeners:
+            try:
+                listener(day)
+            except Exception:
+                logger.exception(f"Ошибка обработчика смены дня на {day}")
+
+    async def _watch(self) -> None:
+        self._announced = self.today()
+        while True:
+            await asyncio.sleep(min(self.seconds_to_midnight() + 0.01, MAX_SLEEP_SEC))
+            day = self.today()
+            if day != self._announced:
+                logger.info(f"Новый день по {self.tz.zone}: {day}")
+                self._announce(day)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch(), name="clock-rollover")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+clock = MoscowClock()
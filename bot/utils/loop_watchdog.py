@@ -0,0 +1,169 @@
+import asyncio
+import json
+import logging
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Границы гистограммы длительности блокировок, мс
+BLOCK_BUCKETS_MS = (100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+@dataclass
+class LoopMetrics:
+    """Метрики лага цикла событий и зафиксированных блокировок"""
+    lag_last_ms: float = 0.0
+    lag_max_ms: float = 0.0
+    # Максимум с прошлого отчёта: всплески между отчётами не теряются
+    lag_window_max_ms: float = 0.0
+    blocked_total: int = 0
+    blocked_seconds_total: float = 0.0
+    blocked_buckets: Dict[str, int] = field(
+        default_factory=lambda: {**{str(b): 0 for b in BLOCK_BUCKETS_MS}, "+Inf": 0}
+    )
+
+    def observe_block(self, duration_ms: float) -> None:
+        self.blocked_total += 1
+        self.blocked_seconds_total += duration_ms / 1000
+        for bound in BLOCK_BUCKETS_MS:
+            if duration_ms <= bound:
+                self.blocked_buckets[str(bound)] += 1
+                break
+        else:
+            self.blocked_buckets["+Inf"] += 1
+
+    def observe_lag(self, lag_ms: float) -> None:
+        self.lag_last_ms = lag_ms
+        self.lag_max_ms = max(self.lag_max_ms, lag_ms)
+        self.lag_window_max_ms = max(self.lag_window_max_ms, lag_ms)
+
+    def snapshot(self, reset_window: bool = False) -> Dict[str, object]:
+        data = {
+            "lag_last_ms": round(self.lag_last_ms, 1),
+            "lag_window_max_ms": round(self.lag_window_max_ms, 1),
+            "lag_max_ms": round(self.lag_max_ms, 1),
+            "blocked_total": self.blocked_total,
+            "blocked_seconds_total": round(self.blocked_seconds_total, 3),
+            "blocked_buckets": dict(self.blocked_buckets),
+        }
+        if reset_window:
+            self.lag_window_max_ms = 0.0
+        return data
+
+
+class LoopWatchdog:
+    """Следит за лагом цикла событий и ловит блокирующие вызовы.
+
+    Внутри цикла крутится «пульс», который раз в ``interval`` секунд отмечает время.
+    Отдельный поток проверяет пульс: если цикл не отзывался дольше ``threshold``,
+    снимается стек потока цикла — это и есть виновник блокировки. Раз в
+    ``report_interval`` секунд метрики лага пишутся в лог (событие ``event_loop_lag``).
+    """
+
+    def __init__(self, threshold: float = 0.2, interval: float = 0.05, stack_limit: int = 25,
+                 report_interval: float = 60.0):
+        self.threshold = threshold
+        self.interval = interval
+        self.stack_limit = stack_limit
+        self.report_interval = report_interval
+        self.metrics = LoopMetrics()
+        self._beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._stall_reported = False
+        self._stall_stack: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> "LoopWatchdog":
+        """Запускает наблюдение; вызывать из работающего цикла событий"""
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(
+            "Loop watchdog запущен: порог %.0f мс, период %.0f мс",
+            self.threshold * 1000, self.interval * 1000,
+        )
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _heartbeat(self) -> None:
+        next_report = time.monotonic() + self.report_interval
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag_ms = max(0.0, now - expected) * 1000
+            self.metrics.observe_lag(lag_ms)
+            if self._stall_reported:
+                self._finish_stall(lag_ms)
+            self._beat = now
+            if self.report_interval > 0 and now >= next_report:
+                next_report = now + self.report_interval
+                self._report()
+
+    def _report(self) -> None:
+        payload = {"event": "event_loop_lag", **self.metrics.snapshot(reset_window=True)}
+        logger.info(json.dumps(payload, ensure_ascii=False), extra={"loop_watchdog": payload})
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval / 2):
+            stalled = time.monotonic() - self._beat - self.interval
+            if stalled > self.threshold and not self._stall_reported:
+                self._stall_reported = True
+                self._stall_stack = self._capture_stack()
+                self._emit("event_loop_blocked", stalled * 1000)
+
+    def _finish_stall(self, duration_ms: float) -> None:
+        self.metrics.observe_block(duration_ms)
+        self._emit("event_loop_resumed", duration_ms)
+        self._stall_reported = False
+        self._stall_stack = []
+
+    def _capture_stack(self) -> List[str]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return []
+        lines = traceback.format_stack(frame)[-self.stack_limit:]
+        return [line.rstrip() for line in lines]
+
+    def _emit(self, event: str, blocked_ms: float) -> None:
+        payload = {
+            "event": event,
+            "blocked_ms": round(blocked_ms, 1),
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "blocked_total": self.metrics.blocked_total,
+            # Последний кадр стека — место, где цикл стоял в момент замера
+            "culprit": self._stall_stack[-1].strip().splitlines()[0] if self._stall_stack else None,
+            "stack": self._stall_stack,
+        }
+        level = logging.WARNING if event == "event_loop_blocked" else logging.INFO
+        logger.log(level, json.dumps(payload, ensure_ascii=False), extra={"loop_watchdog": payload})
+
+
+# Работающий сторож процесса: через него читаются метрики (None, если выключен)
+watchdog: Optional[LoopWatchdog] = None
+
+
+def start_watchdog(threshold: float, report_interval: float = 60.0) -> LoopWatchdog:
+    global watchdog
+    watchdog = LoopWatchdog(threshold=threshold, report_interval=report_interval).start()
+    return watchdog
+
+
+def stop_watchdog() -> None:
+    global watchdog
+    if watchdog is not None:
+        watchdog.stop()
+        watchdog = None
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+# Кадр-лист в этих местах — поток ничего не делает, а ждёт работы или ввода-вывода
+IDLE_FILES = ("selectors.py", "threading.py", "queue.py", os.path.join("concurrent", "futures", "thread.py"))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_lock = threading.Lock()
+
+
+def _label(code) -> str:
+    path = code.co_filename
+    if path.startswith(PROJECT_ROOT):
+        path = os.path.relpath(path, PROJECT_ROOT)
+    else:
+        path = os.path.basename(path)
+    # «;» — разделитель кадров в collapsed-формате
+    return f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ":")
+
+
+@dataclass
+class ProfileResult:
+    """Сэмплы стеков в collapsed-формате: «поток;кадр;...;кадр» -> число сэмплов"""
+    duration: float
+    interval: float
+    samples: int = 0
+    stacks: Counter = field(default_factory=Counter)
+    idle: Set[str] = field(default_factory=set)
+    threads: Counter = field(default_factory=Counter)
+
+    def collapsed(self) -> str:
+        """Формат flamegraph.pl / speedscope / inferno: одна строка на уникальный стек"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def hotspots(self, top: int = 15) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]:
+        """Самые частые кадры: собственное время (лист стека) и включительное — только код бота"""
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in self.stacks.items():
+            if stack in self.idle:
+                continue
+            frames = stack.split(";")[1:]
+            if frames:
+                own[frames[-1]] += count
+            for frame in set(frames):
+                if frame.split("(", 1)[-1].startswith(("bot", "main.py")):
+                    inclusive[frame] += count
+        return own.most_common(top), inclusive.most_common(top)
+
+    def busy_samples(self) -> int:
+        return sum(count for stack, count in self.stacks.items() if stack not in self.idle)
+
+
+class SamplingProfiler:
+    """Сэмплирующий профайлер всего процесса: стеки всех потоков раз в ``interval`` секунд.
+
+    Снимает ``sys._current_frames()``, поэтому видит и корутины обработчиков и задач
+    планировщика (в потоке цикла событий), и потоки ``asyncio.to_thread`` с сетью и
+    разбором HTML. Пока профилирование не запущено, ничего не работает и накладных
+    расходов нет; одновременно идёт не больше одного профилирования.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+
+    def _stack(self, frame) -> Tuple[str, bool]:
+        labels: List[str] = []
+        leaf = frame.f_code.co_filename
+        while frame is not None and len(labels) < self.max_depth:
+            labels.append(_label(frame.f_code))
+            frame = frame.f_back
+        return ";".join(reversed(labels)), leaf.endswith(IDLE_FILES)
+
+    def run(self, duration: float) -> Optional[ProfileResult]:
+        """Блокирует вызывающий поток на ``duration`` секунд; None, если профайлер уже занят"""
+        if not _lock.acquire(blocking=False):
+            return None
+        try:
+            result = ProfileResult(duration=duration, interval=self.interval)
+            me = threading.get_ident()
+            deadline = time.monotonic() + duration
+            while time.monotonic() < deadline:
+                names: Dict[int, str] = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    thread = names.get(ident, f"thread-{ident}").replace(";", ":")
+                    stack, idle = self._stack(frame)
+                    key = f"{thread};{stack}"
+                    result.stacks[key] += 1
+                    result.threads[thread] += 1
+                    if idle:
+                        result.idle.add(key)
+                result.samples += 1
+                time.sleep(self.interval)
+            return result
+        finally:
+            _lock.release()
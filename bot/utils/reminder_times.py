@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+
+from bot.config import settings
+from bot.utils.clock import clock
+
+OFFSET_RE = re.compile(r"^(\d+)\s*([dhm]?)$")
+UNITS = {"d": "days", "h": "hours", "m": "minutes", "": "days"}
+
+
+def parse_offsets(text: str) -> List[timedelta]:
+    """«7d,1d,1h» -> смещения напоминаний до события; ValueError на неверном формате"""
+    return list(_parse_offsets(text))
+
+
+# Наборов смещений и дат немного, а при импорте тысяч событий они повторяются
+@lru_cache(maxsize=256)
+def _parse_offsets(text: str) -> tuple:
+    offsets = set()
+    for part in (text or "").replace(" ", "").split(","):
+        if not part:
+            continue
+        m = OFFSET_RE.match(part.lower())
+        if not m:
+            raise ValueError(f"Неверное смещение «{part}», примеры: 7d, 1d, 3h, 30m, 0")
+        offsets.add(timedelta(**{UNITS[m.group(2)]: int(m.group(1))}))
+    if not offsets:
+        raise ValueError("Не задано ни одного смещения")
+    return tuple(sorted(offsets, reverse=True))
+
+
+def format_offsets(offsets: List[timedelta]) -> str:
+    parts = []
+    for off in sorted(offsets, reverse=True):
+        seconds = int(off.total_seconds())
+        if seconds == 0:
+            parts.append("0")
+        elif seconds % 86400 == 0:
+            parts.append(f"{seconds // 86400}d")
+        elif seconds % 3600 == 0:
+            parts.append(f"{seconds // 3600}h")
+        else:
+            parts.append(f"{seconds // 60}m")
+    return ",".join(parts)
+
+
+@lru_cache(maxsize=4096)
+def event_moment(event_date: str, event_time: Optional[str]) -> datetime:
+    """Момент события по Москве; у событий без времени — час утренних напоминаний"""
+    day = date.fromisoformat(event_date)
+    if event_time:
+        at = time.fromisoformat(event_time)
+    else:
+        at = time(hour=settings.REMINDER_HOUR)
+    return clock.tz.localize(datetime.combine(day, at))
+
+
+def fire_times(event_date: str, event_time: Optional[str], offsets: Optional[str]) -> List[float]:
+    moment = event_moment(event_date, event_time)
+    deltas = _parse_offsets(offsets or settings.REMINDER_OFFSETS)
+    return sorted({(moment - off).timestamp() for off in deltas})
+
+
+def next_fire_at(event_date: str, event_time: Optional[str], offsets: Optional[str], after: float) -> Optional[float]:
+    """Ближайшее напоминание строго позже ``after`` (UTC timestamp) или None"""
+    for ts in fire_times(event_date, event_time, offsets):
+        if ts > after:
+            return ts
+    return None
@@ -1,13 +1,12 @@
 import pytz
 from datetime import datetime
-from bot.config import settings
 import logging
 
+from bot.utils.clock import clock
+
 def get_current_moscow_time():
     """Возвращает текущее время в Москве (UTC+3)"""
-    moscow_tz = pytz.timezone(settings.TZ)
-    current_time = datetime.now(pytz.utc).astimezone(moscow_tz)
-    return current_time
+    return clock.now()
 
 def check_time_difference():
     """Проверяет разницу между серверным временем и московским"""
@@ -20,7 +19,7 @@ def check_time_difference():
 
 def get_current_moscow_date():
     """Возвращает текущую дату в Москве (UTC+3)"""
-    return get_current_moscow_time().date()
+    return clock.today()
 
 def format_date_for_db(date_obj):
     """Форматирует дату для хранения в БД (YYYY-MM-DD)"""
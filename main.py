@@ -8,10 +8,12 @@ from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
 
 from bot.config import settings
-from bot.handlers import register_handlers
+from bot.coordination import LeaderElector
 from bot.scheduler import setup_scheduler
 from bot.storage import events_db
+from bot.utils.clock import clock
 from bot.utils.time_utils import get_current_moscow_time, check_time_difference
+from bot.utils.loop_watchdog import start_watchdog, stop_watchdog
 
 
 def register_handlers(dp: Dispatcher):
@@ -19,6 +21,19 @@ def register_handlers(dp: Dispatcher):
     dp.include_router(router)
 
 
+async def notify_startup(bot: Bot) -> None:
+    """Startup notification to owner"""
+    try:
+        owner_id = settings.OWNER_CHAT_ID or 700064662
+        await bot.send_message(
+            owner_id,
+            "Бот запущен ✅\n"
+            "Текущее время в Москве: " + get_current_moscow_time().strftime("%d.%m.%Y %H:%M")
+        )
+    except Exception as e:
+        logging.error(f"Не удалось отправить уведомление о запуске: {e}")
+
+
 async def main() -> None:
     # Настройка логгирования
     logging.basicConfig(
@@ -36,32 +51,87 @@ async def main() -> None:
     # Проверка разницы во времени
     check_time_difference()
 
+    # Сторож цикла событий (включается через LOOP_WATCHDOG=1); метрики — loop_watchdog.watchdog
+    if settings.LOOP_WATCHDOG:
+        start_watchdog(settings.LOOP_BLOCK_THRESHOLD_MS / 1000, settings.LOOP_LAG_REPORT_SEC)
+
+    # Пул процессов для разбора HTML (включается через PARSE_WORKERS > 0)
+    if settings.PARSE_WORKERS > 0:
+        from bot.parsers.pool import start_parse_pool
+        start_parse_pool()
+
     # Инициализация бота
     bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
     dp = Dispatcher()
 
-    # Инициализация базы данных событий
+    # Инициализация базы данных событий (единственный вызов init_db за время работы)
     events_db.init_db()
 
     # Регистрация обработчиков
     register_handlers(dp)
 
-    # Настройка планировщика
-    scheduler = setup_scheduler(bot)
-    scheduler.start()
+    # Выбор лидера среди реплик: задачи планировщика выполняет только он
+    elector = LeaderElector()
+    elector.start()
 
-    # Startup notification to owner
-    try:
-        owner_id = settings.OWNER_CHAT_ID or 700064662
-        await bot.send_message(
-            owner_id,
-            "Бот запущен ✅\n"
-            "Текущее время в Москве: " + get_current_moscow_time().strftime("%d.%m.%Y %H:%M")
-        )
-    except Exception as e:
-        logging.error(f"Не удалось отправить уведомление о запуске: {e}")
+    # Настройка планировщика (задачи хранятся в БД событий); он запускается,
+    # когда реплика получает аренду лидера, и встаёт на паузу при её потере
+    setup_scheduler(bot, elector)
+
+    # Смена дня по Москве: сброс вчерашних кэшей, клавиатур и сдвиг окна предзагрузки
+    clock.start()
+
+    # Напоминания о событиях: таймер до ближайшего, а не ежедневный обход таблицы
+    from bot.reminders import start_reminders
+    reminders = start_reminders(bot)
+
+    # JSON API расписания для соседних сервисов (включается через API_PORT > 0)
+    api_runner = None
+    if settings.API_PORT:
+        from bot.api import start_api
+        api_runner = await start_api()
 
-    await dp.start_polling(bot)
+    # Уведомление о запуске уходит фоном, чтобы не задерживать start_polling сетевым запросом
+    startup_notice = asyncio.create_task(notify_startup(bot))
+
+    try:
+        if settings.WEBHOOK_URL:
+            await run_webhook(bot, dp)
+        else:
+            await dp.start_polling(bot)
+    finally:
+        startup_notice.cancel()
+        if api_runner is not None:
+            await api_runner.cleanup()
+        await clock.stop()
+        await reminders.stop()
+        await elector.stop()
+        stop_watchdog()
+        if settings.PARSE_WORKERS > 0:
+            from bot.parsers.pool import shutdown_parse_pool
+            shutdown_parse_pool()
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher) -> None:
+    """Приём апдейтов по HTTP: за балансировщиком реплики делят входящий трафик"""
+    from aiohttp import web
+    from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot).register(app, path=settings.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+
+    # setWebhook идемпотентен, поэтому его безопасно вызывать с каждой реплики
+    await bot.set_webhook(settings.WEBHOOK_URL.rstrip("/") + settings.WEBHOOK_PATH)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, settings.WEBHOOK_HOST, settings.WEBHOOK_PORT).start()
+    logging.info(f"Вебхук слушает {settings.WEBHOOK_HOST}:{settings.WEBHOOK_PORT}{settings.WEBHOOK_PATH}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+
+from bot.storage.snapshots import SnapshotStore
+
+DAY = date(2030, 1, 10)
+
+
+def _store(tmp_path) -> SnapshotStore:
+    store = SnapshotStore(path=str(tmp_path / "snapshots.json"))
+    store.update(DAY, {"karo": {DAY: ["A", "B"], DAY + timedelta(days=1): ["A"]}})
+    return store
+
+
+def test_single_empty_snapshot_is_not_a_removal(tmp_path):
+    store = _store(tmp_path)
+    assert store.update(DAY, {"karo": {DAY: []}}) == {}
+    # Страница снова нормальная: ни «сняты», ни «новые»
+    assert store.update(DAY, {"karo": {DAY: ["A", "B"]}}) == {}
+    assert store.titles_for("karo", DAY) == ["A", "B"]
+
+
+def test_confirmed_empty_snapshot_removes_titles(tmp_path):
+    store = _store(tmp_path)
+    store.update(DAY, {"karo": {DAY: []}})
+    diffs = store.update(DAY, {"karo": {DAY: []}})
+    assert diffs["karo"].removed_titles == ["B"]
+    assert diffs["karo"].removed_sessions == {DAY.isoformat(): ["A", "B"]}
+
+
+def test_pending_empty_survives_reload(tmp_path):
+    _store(tmp_path).update(DAY, {"karo": {DAY: []}})
+    reloaded = SnapshotStore(path=str(tmp_path / "snapshots.json"))
+    assert reloaded.update(DAY, {"karo": {DAY: []}})["karo"].removed_titles == ["B"]